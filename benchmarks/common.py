@@ -0,0 +1,190 @@
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from data import config
+from data.column_store import column_store_path
+from data.convert_dataset import FORMATS, convert_dataset
+from data.generate_dataset import generate_dataset
+from data.load_dataset import columnar_path
+from data.month_partitions import partitions_path
+
+# Synthetic datasets and results of the benchmarks, kept between runs
+WORKDIR = 'files/benchmarks'
+
+def benchmark_dataset(scale:float, workdir:str=WORKDIR, formats:Sequence[str]=(), seed:int=0)->str:
+    """
+    Synthetic dataset of a size (see data.generate_dataset), generated on the first run and
+    reused by the next ones. Only the copies in formats are kept, so the dataset is read from
+    the same source on every run.
+
+    Args:
+    scale: Cycles per truck and day relative to the real dataset
+    workdir: Directory of the datasets
+    formats: Typed copies to read the dataset from, any of data.convert_dataset.FORMATS
+    seed: Seed of the generator
+
+    Returns:
+    str: Path of the CSV
+    """
+    path = os.path.join(workdir, f'haul_x{scale:g}_seed{seed}.csv')
+    if not os.path.exists(path):
+        generate_dataset(path, scale=scale, formats=formats, seed=seed)
+
+    copies = {'parquet': columnar_path(path), 'columns': column_store_path(path), 'months': partitions_path(path)}
+    missing = [name for name in FORMATS if name in formats and not os.path.exists(copies[name])]
+    if missing:
+        convert_dataset(path, missing)
+    for name in FORMATS:
+        if name not in formats and os.path.exists(copies[name]):
+            if os.path.isdir(copies[name]):
+                shutil.rmtree(copies[name])
+            else:
+                os.remove(copies[name])
+    return path
+
+def peak_rss()->Optional[int]:
+    """
+    Peak resident memory of this process in bytes, None where the platform doesn't report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def environment()->Dict[str, Any]:
+    """
+    What the results depend on besides the code: versions, machine and data layer settings.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'backend': config.BACKEND,
+        'processes': config.PROCESSES,
+        'chunk_size': config.CHUNK_SIZE,
+        'sketch_compression': config.SKETCH_COMPRESSION,
+    }
+
+def run_worker(module:str, arguments:List[str], dataset_path:str)->Dict[str, Any]:
+    """
+    Runs a benchmark in a new process reading the dataset at dataset_path, so it starts with
+    cold caches and its peak memory is its own.
+
+    Returns:
+    Dict[str, Any]: The JSON the worker printed as its last line
+    """
+    env = dict(os.environ, HAUL_DATASET_PATH=dataset_path)
+    process = subprocess.run([sys.executable, '-m', module, *arguments], env=env, capture_output=True,
+                             text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f'Benchmark {module} {" ".join(arguments)} failed:\n{process.stderr}')
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def _component_props(payload:Any, props:Dict[str, Any])->None:
+    if isinstance(payload, dict):
+        component = payload.get('props')
+        if isinstance(component, dict) and 'id' in component:
+            for name, value in component.items():
+                props[f"{component['id']}.{name}"] = value
+        for value in payload.values():
+            _component_props(value, props)
+    elif isinstance(payload, list):
+        for value in payload:
+            _component_props(value, props)
+
+def callback_inputs(dependencies:List[Dict[str, Any]])->Dict[str, List[Dict[str, str]]]:
+    """
+    Inputs of each callback of a Dash app.
+
+    Args:
+    dependencies: The callbacks, as served by the app at /_dash-dependencies
+
+    Returns:
+    Dict[str, List[Dict[str, str]]]: The id and property of each input, by callback output
+    ('id.property')
+    """
+    return {dependency['output']: dependency['inputs'] for dependency in dependencies}
+
+def callback_body(inputs:Dict[str, List[Dict[str, str]]], output:str, values:Dict[str, Any])->Dict[str, Any]:
+    """
+    Body of the request the Dash renderer sends to run a callback.
+
+    Args:
+    inputs: Inputs of the callbacks, as returned by callback_inputs
+    output: Output of the callback to run
+    values: Value of each of its inputs, as 'id.property' -> value
+
+    Returns:
+    Dict[str, Any]: The JSON to post to /_dash-update-component
+    """
+    items = [dict(item, value=values[f"{item['id']}.{item['property']}"]) for item in inputs[output]]
+    output_id, output_property = output.rsplit('.', 1)
+    return {
+        'output': output,
+        'outputs': {'id': output_id, 'property': output_property},
+        'inputs': items,
+        'changedPropIds': [f"{item['id']}.{item['property']}" for item in items],
+        'state': [],
+    }
+
+def component_props(page:Any)->Dict[str, Any]:
+    """
+    Properties of the components of a page that have an id.
+
+    Args:
+    page: JSON of a layout or a callback response, decoded
+
+    Returns:
+    Dict[str, Any]: Value of each property, as 'id.property' -> value
+    """
+    props = {}
+    _component_props(page, props)
+    return props
+
+def page_callbacks(inputs:Dict[str, List[Dict[str, str]]], page:Any)->List[Tuple[str, Dict[str, Any]]]:
+    """
+    Callbacks the Dash renderer runs when a page is displayed: those whose inputs are all
+    components of the page, with their initial values.
+
+    Args:
+    inputs: Inputs of the callbacks, as returned by callback_inputs
+    page: JSON of the page, decoded
+
+    Returns:
+    List[Tuple[str, Dict[str, Any]]]: The output and the values of the inputs of each callback,
+    as taken by callback_body
+    """
+    props = component_props(page)
+    callbacks = []
+    for output, items in inputs.items():
+        keys = [f"{item['id']}.{item['property']}" for item in items]
+        if keys and all(key in props for key in keys):
+            callbacks.append((output, {key: props[key] for key in keys}))
+    return callbacks
+
+def write_results(path:str, results:List[Dict[str, Any]])->None:
+    """
+    Writes results as JSON, with the environment they were measured in.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({'environment': environment(), 'results': results}, file, indent=2)
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from benchmarks.common import WORKDIR, callback_body, callback_inputs, component_props, page_callbacks, write_results
+
+CALLBACK_PATH = '/_dash-update-component'
+# Output of the callback that displays the pages of the sidebar, see main.display_page
+PAGE_OUTPUT = 'page-content.children'
+
+class _LocalClient:
+    """
+    Requests to the Dash app of main.py in this process, through the Flask test client. The
+    simulated users are threads, as the requests of a threaded server process.
+    """
+    def __init__(self, app:Any):
+        self.client = app.server.test_client()
+
+    def get(self, path:str)->Tuple[int, bytes]:
+        response = self.client.get(path)
+        return response.status_code, response.data
+
+    def post(self, path:str, body:Dict[str, Any])->Tuple[int, bytes]:
+        response = self.client.post(path, json=body)
+        return response.status_code, response.data
+
+class _HttpClient:
+    """
+    Requests to a running dashboard, such as python main.py, over HTTP.
+    """
+    def __init__(self, url:str, timeout:float):
+        self.url, self.timeout = url.rstrip('/'), timeout
+
+    def _request(self, request:urllib.request.Request)->Tuple[int, bytes]:
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+
+    def get(self, path:str)->Tuple[int, bytes]:
+        return self._request(urllib.request.Request(self.url + path))
+
+    def post(self, path:str, body:Dict[str, Any])->Tuple[int, bytes]:
+        return self._request(urllib.request.Request(self.url + path, data=json.dumps(body).encode(), method='POST',
+                                                    headers={'Content-Type': 'application/json'}))
+
+def sidebar_routes(layout:Any)->List[str]:
+    """
+    Routes of the links of the app layout, as served at /_dash-layout, other than the home page.
+    """
+    routes = []
+    def collect(node:Any)->None:
+        if isinstance(node, dict):
+            if node.get('type') == 'NavLink' and node.get('props', {}).get('href', '/') != '/':
+                routes.append(node['props']['href'])
+            for value in node.values():
+                collect(value)
+        elif isinstance(node, list):
+            for value in node:
+                collect(value)
+    collect(layout)
+    return routes
+
+def _options(props:Dict[str, Any], key:str)->List[Any]:
+    """
+    Values a user can pick for a callback input, from the options of its component.
+    """
+    options = props.get(key.rsplit('.', 1)[0] + '.options') or []
+    return [option['value'] if isinstance(option, dict) else option for option in options]
+
+class _User:
+    """
+    A simulated user: opens the dashboard, then visits random pages of the sidebar. Each page
+    runs its callbacks with their initial values, as the browser does, and the user changes
+    the inputs that have options (the view-toggle of the monthly cycles) with some probability.
+    """
+    def __init__(self, client:Any, routes:List[str], inputs:Dict[str, List[Dict[str, str]]],
+                 think_time:float, interaction:float, seed:int, records:List[Tuple[str, float, float, bool]],
+                 lock:threading.Lock):
+        self.client, self.routes, self.inputs = client, routes, inputs
+        self.think_time, self.interaction = think_time, interaction
+        self.rng = random.Random(seed)
+        self.records, self.lock = records, lock
+
+    def _timed(self, label:str, method:str, path:str, body:Optional[Dict[str, Any]]=None)->Optional[bytes]:
+        start = time.perf_counter()
+        try:
+            status, data = self.client.get(path) if method == 'GET' else self.client.post(path, body)
+            ok = status == 200
+        except Exception:
+            ok, data = False, b''
+        latency = time.perf_counter() - start
+        with self.lock:
+            self.records.append((label, start, latency, ok))
+        return data if ok else None
+
+    def _think(self)->None:
+        if self.think_time > 0:
+            time.sleep(self.rng.expovariate(1 / self.think_time))
+
+    def open_dashboard(self)->None:
+        self._timed('GET /', 'GET', '/')
+        self._timed('GET /_dash-layout', 'GET', '/_dash-layout')
+        self._timed('GET /_dash-dependencies', 'GET', '/_dash-dependencies')
+
+    def visit(self, route:str)->None:
+        response = self._timed(route, 'POST', CALLBACK_PATH, callback_body(self.inputs, PAGE_OUTPUT, {'url.pathname': route}))
+        if response is None:
+            return
+        page = json.loads(response)['response']
+        callbacks = page_callbacks(self.inputs, page)
+        for output, values in callbacks:
+            self._timed(f"{output} ({', '.join(map(str, values.values()))})", 'POST', CALLBACK_PATH,
+                        callback_body(self.inputs, output, values))
+
+        props = component_props(page)
+        for output, values in callbacks:
+            for key in values:
+                choices = [value for value in _options(props, key) if value != values[key]]
+                if choices and self.rng.random() < self.interaction:
+                    self._think()
+                    changed = dict(values, **{key: self.rng.choice(choices)})
+                    self._timed(f"{output} ({', '.join(map(str, changed.values()))})", 'POST', CALLBACK_PATH,
+                                callback_body(self.inputs, output, changed))
+
+    def run(self, deadline:float)->None:
+        self.open_dashboard()
+        while time.perf_counter() < deadline:
+            self.visit(self.rng.choice(self.routes))
+            self._think()
+
+def summarize(records:List[Tuple[str, float, float, bool]], duration:float)->List[Dict[str, Any]]:
+    """
+    Latency percentiles, throughput and error rate of each kind of request, and of all of them.
+
+    Args:
+    records: Label, start, latency in seconds and success of each request
+    duration: Wall time of the test, in seconds
+
+    Returns:
+    List[Dict[str, Any]]: One row per label, the total last
+    """
+    groups: Dict[str, List[Tuple[float, bool]]] = {}
+    for label, _, latency, ok in records:
+        groups.setdefault(label, []).append((latency, ok))
+    groups['total'] = [(latency, ok) for _, _, latency, ok in records]
+
+    summary = []
+    for label, values in groups.items():
+        latencies = np.array([latency for latency, _ in values])
+        errors = sum(not ok for _, ok in values)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+        summary.append({
+            'label': label,
+            'requests': len(values),
+            'errors': errors,
+            'error_rate': errors / len(values) if values else 0,
+            'throughput': len(values) / duration,
+            'p50_seconds': float(p50),
+            'p95_seconds': float(p95),
+            'p99_seconds': float(p99),
+            'max_seconds': float(latencies.max()) if len(latencies) else None,
+        })
+    return summary
+
+def run(users:int, duration:float, url:Optional[str]=None, think_time:float=1, interaction:float=0.5,
+        ramp_up:float=0, timeout:float=60, seed:int=0)->Tuple[List[Dict[str, Any]], float]:
+    """
+    Simulates users navigating the dashboard at the same time.
+
+    Args:
+    users: Concurrent users
+    duration: Seconds the users keep navigating, a visit in progress is finished
+    url: Dashboard to test, such as http://127.0.0.1:8050. If None, the app of main.py in this
+    process
+    think_time: Mean seconds a user waits between actions, exponentially distributed. 0 sends
+    the next request as soon as the previous one is answered
+    interaction: Probability of changing each input with options of a page, such as the
+    view-toggle of the monthly cycles
+    ramp_up: Seconds over which the users start, 0 starts them all at once as in the morning
+    spike
+    timeout: Seconds before an HTTP request is counted as an error
+    seed: Seed of the navigation of the users
+
+    Returns:
+    Tuple[List[Dict[str, Any]], float]: The summary of the requests (see summarize) and the
+    wall time of the test
+    """
+    if url is None:
+        import main
+        make_client = lambda: _LocalClient(main.app)
+    else:
+        make_client = lambda: _HttpClient(url, timeout)
+
+    client = make_client()
+    _, layout = client.get('/_dash-layout')
+    _, dependencies = client.get('/_dash-dependencies')
+    routes = sidebar_routes(json.loads(layout))
+    inputs = callback_inputs(json.loads(dependencies))
+
+    records, lock = [], threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = []
+    for i in range(users):
+        user = _User(make_client(), routes, inputs, think_time, interaction, seed + i, records, lock)
+        threads.append(threading.Thread(target=user.run, args=(deadline,), daemon=True))
+    for i, thread in enumerate(threads):
+        if ramp_up and i:
+            time.sleep(ramp_up / users)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return summarize(records, elapsed), elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulates concurrent users of the dashboard')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=60, help='seconds')
+    parser.add_argument('--url', help='dashboard to test, such as http://127.0.0.1:8050. The app is run in this process if not given')
+    parser.add_argument('--think-time', type=float, default=1, help='mean seconds between the actions of a user')
+    parser.add_argument('--interaction', type=float, default=0.5, help='probability of changing a view of a page')
+    parser.add_argument('--ramp-up', type=float, default=0, help='seconds over which the users start')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=os.path.join(WORKDIR, 'load_test.json'))
+    args = parser.parse_args()
+
+    summary, elapsed = run(args.users, args.duration, args.url, args.think_time, args.interaction,
+                           args.ramp_up, args.timeout, args.seed)
+    print(f"{'request':<60} {'count':>6} {'errors':>7} {'req/s':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}")
+    for row in summary:
+        print(f"{row['label'][:60]:<60} {row['requests']:>6} {row['error_rate']:>7.1%} {row['throughput']:>7.2f} "
+              f"{row['p50_seconds']:>8.3f} {row['p95_seconds']:>8.3f} {row['p99_seconds']:>8.3f}")
+
+    write_results(args.output, [dict(row, users=args.users, duration=elapsed, think_time=args.think_time,
+                                     url=args.url) for row in summary])
+    print(f'Results written to {args.output}')
@@ -0,0 +1,217 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from benchmarks.common import WORKDIR, benchmark_dataset, callback_body, callback_inputs, page_callbacks, peak_rss, run_worker, write_results
+
+# Relative increase over the baseline reported as a regression
+THRESHOLD = 0.2
+# Smaller time increases are noise, whatever their relative size
+MIN_SECONDS = 0.005
+# Source of the dashboard, whose sidebar lists the pages
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+# Measures compared with the baseline
+COMPARED = ['first_layout_seconds', 'layout_seconds', 'serialize_seconds', 'payload_bytes', 'callbacks_seconds',
+            'callbacks_payload_bytes']
+
+def routes()->List[str]:
+    """
+    Routes of the sidebar of main.py, the pages display_page builds. They are read from its
+    source: importing main builds every section on the configured dataset, which the
+    benchmarks replace with synthetic ones in the workers.
+    """
+    with open(MAIN_PATH) as file:
+        tree = ast.parse(file.read())
+    links = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == 'NavLink':
+            links += [keyword.value.value for keyword in node.keywords
+                      if keyword.arg == 'href' and isinstance(keyword.value, ast.Constant)]
+    return links
+
+def _count_figures(payload:Any)->int:
+    if isinstance(payload, dict):
+        own = 1 if payload.get('type') == 'Graph' else 0
+        return own + sum(_count_figures(value) for value in payload.values())
+    if isinstance(payload, list):
+        return sum(_count_figures(value) for value in payload)
+    return 0
+
+def measure(route:str, repeat:int)->Dict[str, Any]:
+    """
+    Measures a page in this process, which must not have run anything else yet.
+
+    - import_seconds: importing main, including the data its sections compute when imported
+    - first_layout_seconds: first display_page call, the first visit after a restart
+    - layout_seconds: median of repeat more calls, the following visits
+    - serialize_seconds: median time to encode the page as the JSON of the callback response,
+    as Dash does
+    - payload_bytes: size of that JSON
+    - callbacks_seconds: median time of the callbacks the page runs once displayed, such as
+    the view-toggle of the monthly cycles, requested to the Dash server as the browser does
+    - callbacks_payload_bytes: size of their responses
+    - peak_rss_bytes: peak resident memory of the process
+
+    Returns:
+    Dict[str, Any]: The measures and the number of figures of the page
+    """
+    start = time.perf_counter()
+    import main
+    from dash._utils import to_json
+    import_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    page = main.display_page(route)
+    first_layout_seconds = time.perf_counter() - start
+
+    layout_seconds, serialize_seconds = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = main.display_page(route)
+        layout_seconds.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        payload = to_json(page)
+        serialize_seconds.append(time.perf_counter() - start)
+    if not serialize_seconds:
+        payload = to_json(page)
+
+    client = main.app.server.test_client()
+    inputs = callback_inputs(client.get('/_dash-dependencies').get_json())
+    bodies = [callback_body(inputs, output, values) for output, values in page_callbacks(inputs, json.loads(payload))]
+    callbacks_seconds, callbacks_payload = [], 0
+    for _ in range(max(repeat, 1) if bodies else 0):
+        start = time.perf_counter()
+        callbacks_payload = 0
+        for body in bodies:
+            response = client.post('/_dash-update-component', json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"Callback {body['output']} of {route} failed with status {response.status_code}")
+            callbacks_payload += len(response.data)
+        callbacks_seconds.append(time.perf_counter() - start)
+
+    from data import config, load_dataset
+    return {
+        'route': route,
+        'dataset_rows': len(load_dataset(['date'])),
+        'dataset_bytes': os.path.getsize(config.DATASET_PATH),
+        'figures': _count_figures(json.loads(payload)),
+        'import_seconds': import_seconds,
+        'first_layout_seconds': first_layout_seconds,
+        'layout_seconds': statistics.median(layout_seconds) if layout_seconds else None,
+        'serialize_seconds': statistics.median(serialize_seconds) if serialize_seconds else None,
+        'payload_bytes': len(payload.encode()),
+        'callbacks': len(bodies),
+        'callbacks_seconds': statistics.median(callbacks_seconds) if callbacks_seconds else None,
+        'callbacks_payload_bytes': callbacks_payload,
+        'peak_rss_bytes': peak_rss(),
+    }
+
+def compare(results:List[Dict[str, Any]], baseline:List[Dict[str, Any]], threshold:float=THRESHOLD)->List[str]:
+    """
+    Compares results with a baseline run, by route and dataset size.
+
+    Args:
+    results: Measures of this run
+    baseline: Measures of the baseline run
+    threshold: Relative increase of a measure reported as a regression
+
+    Returns:
+    List[str]: A description of each regression, empty if there are none
+    """
+    previous = {(result['route'], result['scale']): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get((result['route'], result['scale']))
+        if base is None:
+            continue
+        for measure_name in COMPARED:
+            value, base_value = result.get(measure_name), base.get(measure_name)
+            if value is None or not base_value:
+                continue
+            increase = value - base_value
+            noise = MIN_SECONDS if measure_name.endswith('_seconds') else 0
+            if increase > threshold * base_value and increase > noise:
+                regressions.append(f"{result['route']} x{result['scale']:g} {measure_name}: "
+                                   f"{base_value:.4g} -> {value:.4g} (+{increase / base_value:.0%})")
+    return regressions
+
+def run(scales:List[float], pages:List[str], repeat:int=5, formats:List[str]=(),
+        workdir:str=WORKDIR)->List[Dict[str, Any]]:
+    """
+    Builds every page on synthetic datasets of several sizes, each page in its own process
+    (see measure).
+
+    Args:
+    scales: Sizes of the datasets, as cycles per truck and day relative to the real dataset
+    pages: Routes to build
+    repeat: Builds per page after the first
+    formats: Typed copies to read the datasets from, the CSV if empty
+    workdir: Directory of the datasets
+
+    Returns:
+    List[Dict[str, Any]]: The measures of each page and scale
+    """
+    results = []
+    for scale in scales:
+        path = benchmark_dataset(scale, workdir, formats)
+        for route in pages:
+            result = run_worker('benchmarks.pages', ['--worker', route, '--repeat', str(repeat)], path)
+            result.update(scale=scale, formats=list(formats))
+            results.append(result)
+            print(f"{route:<28} x{scale:<6g} first {result['first_layout_seconds']:7.3f} s  "
+                  f"layout {result['layout_seconds'] or 0:7.3f} s  serialize {result['serialize_seconds'] or 0:7.3f} s  "
+                  f"{result['payload_bytes'] / 2**10:9.1f} KiB  callbacks {result['callbacks_seconds'] or 0:7.3f} s  "
+                  f"{result['callbacks_payload_bytes'] / 2**10:9.1f} KiB", flush=True)
+    return results
+
+def _read_results(path:str)->Optional[List[Dict[str, Any]]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)['results']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks building and serializing every page of the dashboard')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1],
+                        help='dataset sizes, as multiples of the daily cycles of the real dataset')
+    parser.add_argument('--routes', nargs='+', help='pages to build, every route of the sidebar by default')
+    parser.add_argument('--repeat', type=int, default=5, help='builds per page after the first')
+    parser.add_argument('--formats', nargs='*', default=[], help='copies to read from, any of parquet, columns, months')
+    parser.add_argument('--workdir', default=WORKDIR)
+    parser.add_argument('--output', help='results file, pages.json in the workdir by default')
+    parser.add_argument('--baseline', help='results to compare with, pages_baseline.json in the workdir by default')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative increase reported as a regression, 0.2 is 20%%')
+    parser.add_argument('--worker', metavar='ROUTE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.output is None:
+        args.output = os.path.join(args.workdir, 'pages.json')
+    if args.baseline is None:
+        args.baseline = os.path.join(args.workdir, 'pages_baseline.json')
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.repeat)))
+        sys.exit()
+
+    results = run(args.scales, args.routes or routes(), args.repeat, args.formats, args.workdir)
+    write_results(args.output, results)
+    print(f'Results written to {args.output}')
+
+    if args.save_baseline:
+        write_results(args.baseline, results)
+        print(f'Baseline written to {args.baseline}')
+    else:
+        baseline = _read_results(args.baseline)
+        if baseline is None:
+            print(f'No baseline at {args.baseline}, store one with --save-baseline')
+        else:
+            regressions = compare(results, baseline, args.threshold)
+            for regression in regressions:
+                print(f'REGRESSION {regression}')
+            print(f'{len(regressions)} regressions over {args.threshold:.0%} against {args.baseline}')
+            sys.exit(1 if regressions else 0)
@@ -0,0 +1,133 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+import data
+from data import config
+from data.convert_dataset import FORMATS
+from benchmarks.common import WORKDIR, benchmark_dataset, peak_rss, run_worker, write_results
+
+# Public transformations of data.transformations, with the arguments the dashboard uses
+CASES: Dict[str, Callable[[], Any]] = {
+    'aggregate_daily_cycles': data.aggregate_daily_cycles,
+    'aggregate_daily_tons': data.aggregate_daily_tons,
+    'aggregate_daily_active_trucks': data.aggregate_daily_active_trucks,
+    'aggregate_monthly_cycles': data.aggregate_monthly_cycles,
+    'aggregate_monthly_tons': data.aggregate_monthly_tons,
+    'aggregate_trucks_daily_tons(only_active_trucks=True)': lambda: data.aggregate_trucks_daily_tons(only_active_trucks=True),
+    'aggregate_trucks_daily_tons(only_active_trucks=False)': lambda: data.aggregate_trucks_daily_tons(only_active_trucks=False),
+    'CAEX61_comparison': data.CAEX61_comparison,
+}
+
+def _clear_caches()->None:
+    data.clear_dataset_cache()
+    data.clear_cube_cache()
+    gc.collect()
+
+def _result_rows(result:Any)->int:
+    if isinstance(result, tuple):
+        return sum(len(part) for part in result)
+    return len(result)
+
+def measure(case:str, repeat:int)->Dict[str, Any]:
+    """
+    Measures a transformation in this process, which must not have run anything else yet.
+
+    - cold_seconds: first call, reading the dataset and building the cube
+    - warm_seconds: median of repeat more calls, over the cached dataset and cube
+    - peak_traced_bytes: peak of the memory allocated by Python and numpy during a cold call,
+    measured with tracemalloc in a separate call since it slows allocations down. Arrow buffers
+    (Parquet reads, the duckdb and polars backends) are not traced
+    - peak_rss_bytes, baseline_rss_bytes: peak resident memory of the process after the cold
+    call, and before it with the modules imported
+
+    Returns:
+    Dict[str, Any]: The measures, the rows of the dataset and of the result
+    """
+    func = CASES[case]
+    baseline_rss = peak_rss()
+
+    start = time.perf_counter()
+    result = func()
+    cold_seconds = time.perf_counter() - start
+    cold_rss = peak_rss()
+
+    warm_seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        warm_seconds.append(time.perf_counter() - start)
+
+    _clear_caches()
+    tracemalloc.start()
+    func()
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'case': case,
+        'dataset_rows': len(data.load_dataset(['date'])),
+        'dataset_bytes': os.path.getsize(config.DATASET_PATH),
+        'result_rows': _result_rows(result),
+        'cold_seconds': cold_seconds,
+        'warm_seconds': statistics.median(warm_seconds) if warm_seconds else None,
+        'warm_min_seconds': min(warm_seconds) if warm_seconds else None,
+        'peak_traced_bytes': peak_traced,
+        'peak_rss_bytes': cold_rss,
+        'baseline_rss_bytes': baseline_rss,
+    }
+
+def run(scales:List[float], cases:List[str], repeat:int=5, formats:List[str]=(),
+        workdir:str=WORKDIR)->List[Dict[str, Any]]:
+    """
+    Benchmarks the transformations on synthetic datasets of several sizes, each case in its own
+    process (see measure).
+
+    Args:
+    scales: Sizes of the datasets, as cycles per truck and day relative to the real dataset
+    cases: Names of CASES to run
+    repeat: Warm calls per case
+    formats: Typed copies to read the datasets from, the CSV if empty
+    workdir: Directory of the datasets
+
+    Returns:
+    List[Dict[str, Any]]: The measures of each case and scale
+    """
+    results = []
+    for scale in scales:
+        path = benchmark_dataset(scale, workdir, formats)
+        for case in cases:
+            result = run_worker('benchmarks.transformations', ['--worker', case, '--repeat', str(repeat)], path)
+            result.update(scale=scale, formats=list(formats))
+            results.append(result)
+            print(f"{case:<55} x{scale:<6g} {result['dataset_rows']:>10} rows  "
+                  f"cold {result['cold_seconds']:8.3f} s  warm {result['warm_seconds'] or 0:8.4f} s  "
+                  f"peak {result['peak_traced_bytes'] / 2**20:8.1f} MiB", flush=True)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the transformations of data.transformations')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10],
+                        help='dataset sizes, as multiples of the daily cycles of the real dataset')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), metavar='CASE',
+                        help='transformations to run, all by default')
+    parser.add_argument('--repeat', type=int, default=5, help='warm calls per case')
+    parser.add_argument('--formats', nargs='*', default=[], help=f"copies to read from, any of {', '.join(FORMATS)}")
+    parser.add_argument('--workdir', default=WORKDIR)
+    parser.add_argument('--output', help='results file, transformations.json in the workdir by default')
+    parser.add_argument('--worker', metavar='CASE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.output is None:
+        args.output = os.path.join(args.workdir, 'transformations.json')
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.repeat)))
+    else:
+        for unknown in (set(args.cases) - set(CASES)) | (set(args.formats) - set(FORMATS)):
+            parser.error(f'invalid case or format: {unknown}')
+        write_results(args.output, run(args.scales, args.cases, args.repeat, args.formats, args.workdir))
+        print(f'Results written to {args.output}')
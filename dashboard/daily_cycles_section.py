@@ -4,6 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from dash import html, dcc
 
+@instrument('figure')
 def graph_daily_cycles_dist()->go.Figure:
     """
     Graph of the distribution of daily cycles across all the time
@@ -18,15 +19,13 @@ def graph_daily_cycles_dist()->go.Figure:
         )
     return hist
 
+@instrument('figure')
 def graph_daily_cycles_vs_time_dist()->go.Figure:
     """
     Graph of the distribution of daily cycles respect to time
     """
-    daily_cycles = aggregate_daily_cycles()
-    monthly_cycles = aggregate_monthly_cycles()
-    monthly_cycles = monthly_cycles.set_index('month')
-    daily_cycles['month'] = daily_cycles['date'].dt.to_period('M').astype(str)
-    daily_cycles = daily_cycles.join(monthly_cycles, on='month')
+    daily, monthly_cycles, _ = aggregate_daily_and_monthly()
+    daily_cycles = daily.join(monthly_cycles.set_index('month'), on='month')
     fig = go.Figure()
     fig.add_trace(
         go.Scatter(
@@ -69,6 +68,7 @@ efecto estacional claro en la cantidad de ciclos diarios, hay una leve oscilaci
 una ventana de tiempo mayor para un resultado más concluyente.""",]
 daily_distribution_analysis = [html.P(text) for text in daily_distribution_analysis_texts]
 
+@instrument('layout')
 def daily_cycles_layout() -> html.Div:
     """
     Daily cycles section layout
@@ -4,6 +4,7 @@ import plotly.graph_objects as go
 from dash import html, dcc
 from plotly.subplots import make_subplots
 
+@instrument('figure')
 def graph_all_daily_tons_dist():
     daily_tons = aggregate_daily_tons()
     hist = px.histogram(daily_tons, 
@@ -16,12 +17,10 @@ def graph_all_daily_tons_dist():
     return hist
 
 
+@instrument('figure')
 def graph_daily_tons_dist():
-    daily_tons = aggregate_daily_tons()
-    monthly_tons = aggregate_monthly_tons()
-    monthly_tons = monthly_tons.set_index('month')
-    daily_tons['month'] = daily_tons['date'].dt.to_period('M').astype(str)
-    daily_tons = daily_tons.join(monthly_tons, on='month')
+    daily, _, monthly_tons = aggregate_daily_and_monthly()
+    daily_tons = daily.join(monthly_tons.set_index('month'), on='month')
     fig = go.Figure()
     fig.add_trace(
         go.Scatter(
@@ -46,10 +45,9 @@ def graph_daily_tons_dist():
     
     return fig
 
+@instrument('figure')
 def graph_daily_tons_vs_cycles_scatter():
-    daily_tons = aggregate_daily_tons()
-    daily_cycles = aggregate_daily_cycles()
-    daily_tons['daily_cycles'] = daily_cycles['daily_cycles']
+    daily_tons, _, _ = aggregate_daily_and_monthly()
     fig = px.scatter(daily_tons, y='daily_tons', x='daily_cycles', title='Toneladas totales diarias vs ciclos diarios')
     fig.update_layout(
         yaxis_title='Toneladas diarias',
@@ -57,10 +55,9 @@ def graph_daily_tons_vs_cycles_scatter():
         )
     return fig
 
+@instrument('figure')
 def graph_daily_tons_vs_cycles_double_axis_dist():
-    daily_tons = aggregate_daily_tons()
-    daily_cycles = aggregate_daily_cycles().set_index('date')
-    daily_tons = daily_tons.join(daily_cycles, on='date')
+    daily_tons, _, _ = aggregate_daily_and_monthly()
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     fig.add_trace(
         go.Scatter(
@@ -86,10 +83,9 @@ def graph_daily_tons_vs_cycles_double_axis_dist():
         )
     return fig
 
+@instrument('figure')
 def graph_daily_tons_vs_cycles_dists():
-    daily_tons = aggregate_daily_tons()
-    daily_cycles = aggregate_daily_cycles().set_index('date')
-    daily_tons = daily_tons.join(daily_cycles, on='date')
+    daily_tons, _, _ = aggregate_daily_and_monthly()
     min_cycles = daily_tons['daily_cycles'].min()
     max_cycles = daily_tons['daily_cycles'].max()
     min_tons = daily_tons['daily_tons'].min()
@@ -148,6 +144,7 @@ analysis_2_text = """
 Las distribuciones de tonelaje movido y cantidad de Ciclos son prácticamente idénticas en forma,
 tanto en su variación a lo largo del tiempo como en su distribución general."""
 analysis_2 = html.P(analysis_2_text)
+@instrument('layout')
 def layout() -> html.Div:
     return html.Div(
             id='daily-tons-section',
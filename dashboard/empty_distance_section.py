@@ -1,19 +1,20 @@
 from dash import html, dcc
 import pandas as pd
+from data import scan, split_groups, CAEX61_first_date, instrument
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-static_df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-
+@instrument('figure')
 def plot_variable_dist_for_period(  variable:str, 
                                     x_min:float=None, 
                                     x_max:float=None,
                                     bins:int=None,
                                     df:pd.DataFrame = None)->go.Figure:
     if df is None:
-        df = static_df
-    df = df[df[variable] != 0]
+        df = scan().select(variable).filter(variable, '!=', 0).collect()
+    else:
+        df = df[df[variable] != 0]
 
     fig = go.Figure()
     if bins:
@@ -33,34 +34,36 @@ def plot_variable_dist_for_period(  variable:str,
 
     return fig
 
+@instrument('figure')
 def plot_variable_dist_since_CAEX61(variable:str, df:pd.DataFrame=None)->go.Figure:
     if df is None:
-        df = static_df
-    df = df[df[variable] != 0]
-    CAEX61_first_date = df[df['truck'] == 'CAEX61']['date'].min()
-    df = df[df['date'] >= CAEX61_first_date]
+        df = scan().select(variable).filter('date', '>=', CAEX61_first_date(variable)).filter(variable, '!=', 0).collect()
+    else:
+        df = df[df[variable] != 0]
+        df = df[df['date'] >= df[df['truck'] == 'CAEX61']['date'].min()]
 
     return plot_variable_dist_for_period(variable, df=df)
 
 
-def plot_dist(target_variable: str, agg_func: str, df:pd.DataFrame=None)->go.Figure:
-    if df is None:
-        df = static_df
-    df = df[['loader', 'truck', target_variable]]
+@instrument('figure')
+def plot_dist(target_variable: str, agg_func: str, cube:pd.DataFrame=None, include_zeros:bool=True,
+              start:pd.Timestamp=None)->go.Figure:
+    query = scan(df=cube).group_by('loader', 'truck').agg(**{
+        'count': (target_variable, 'count'),
+        agg_func: (target_variable, agg_func),
+    })
+    if start is not None:
+        query = query.filter('date', '>=', start)
+    if not include_zeros:
+        query = query.filter(target_variable, '!=', 0)
+    stats = query.collect()
+    stats = stats[stats['count'] > 0]
     fig = go.Figure()
-    if agg_func == 'Q1':
-        agg_func_call = lambda x: x.quantile(0.25)
-    elif agg_func == 'Q3':
-        agg_func_call = lambda x: x.quantile(0.75)
-    else:
-        agg_func_call = agg_func
-    for loader in df['loader'].unique():
-        loader_data = df[df['loader'] == loader].drop(columns='loader')
-        loader_data = loader_data.groupby('truck').agg(agg_func_call).reset_index()
+    for loader, loader_data in split_groups(stats, 'loader').items():
         fig.add_trace(
             go.Bar(
                 x=loader_data['truck'],
-                y=loader_data[target_variable],
+                y=loader_data[agg_func],
                 name=loader
             )
         )
@@ -73,17 +76,17 @@ def plot_dist(target_variable: str, agg_func: str, df:pd.DataFrame=None)->go.Fig
 
     return fig
 
+@instrument('figure')
 def plot_variable_dist_by_loader(   variable:str, 
                                     df:pd.DataFrame=None, 
                                     overlay:bool=False,
                                     xmin:float=None,
                                     xmax:float=None)->go.Figure:
     if df is None:
-        df = static_df
+        df = scan().select('loader', variable).collect()
     df = df[['loader', variable]]
     fig = go.Figure()
-    for loader in df['loader'].unique():
-        loader_data = df[df['loader'] == loader].drop(columns='loader')
+    for loader, loader_data in split_groups(df, 'loader').items():
         fig.add_trace(
             go.Histogram(
                 x=loader_data[variable],
@@ -103,23 +106,19 @@ def plot_variable_dist_by_loader(   variable:str,
     
     return fig
 
+@instrument('figure')
 def plot_variable_dist_by_loader_since_CAEX61(variable:str, df:pd.DataFrame=None)->go.Figure:
     if df is None:
-        df = static_df
-    df = df[df[variable] != 0]
-    CAEX61_first_date = df[df['truck'] == 'CAEX61']['date'].min()
-    df = df[df['date'] >= CAEX61_first_date]
+        df = scan().select('loader', variable).filter('date', '>=', CAEX61_first_date(variable)).filter(variable, '!=', 0).collect()
+    else:
+        df = df[df[variable] != 0]
+        df = df[df['date'] >= df[df['truck'] == 'CAEX61']['date'].min()]
 
     return plot_variable_dist_by_loader(variable, df)
 
+@instrument('figure')
 def plot_variable_since_CAEX61(variable:str, agg_func:str)->go.Figure:
-    df = static_df
-    df['date'] = pd.to_datetime(df['date'])
-    df = df[df[variable] != 0]
-    CAEX61_first_date = df[df['truck'] == 'CAEX61']['date'].min()
-    df = df[df['date'] >= CAEX61_first_date]
-
-    return plot_dist(variable, agg_func, df)
+    return plot_dist(variable, agg_func, include_zeros=False, start=CAEX61_first_date(variable))
 
 empty_distance_analysis_texts = [
 """
@@ -177,6 +176,7 @@ alargando la cola de la distribución, sería recomendable revisar para qué se
 3 rutas de esa longitud. En contraste, PH06 presenta rutas de esa longitud, pero que se diferencian
 más entre sí, a la vez que tiene una concentración muy alta en su ruta principal."""]
 empty_distance_conclusion = [html.P(text) for text in empty_distance_conclusion_texts]
+@instrument('layout')
 def layout()->html.Div:
     """
     Layout for the other variables analysis section
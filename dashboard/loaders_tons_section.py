@@ -1,19 +1,26 @@
-import pandas as pd
+from data import scan, split_groups, instrument
 import plotly.graph_objs as go
 from dash import html, dcc, dash_table
 
+@instrument('figure')
 def zero_tons_rows_table()->dash_table.DataTable:
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    zero_tons_rows = df[df['ton'] == 0]
+    zero_tons_rows = scan().filter('ton', '==', 0).collect()
+    # Only dates and codes as text for the JSON, the metrics stay numbers so they sort as such
+    zero_tons_rows['date'] = zero_tons_rows['date'].dt.strftime('%Y-%m-%d')
+    for column in zero_tons_rows.select_dtypes('category').columns:
+        zero_tons_rows[column] = zero_tons_rows[column].astype(str)
+    for column in zero_tons_rows.select_dtypes('float32').columns:
+        # float32 values widened as written in the dataset, 273.61 rather than 273.6099853515625
+        zero_tons_rows[column] = zero_tons_rows[column].astype('float64').round(2)
     return dash_table.DataTable(
         id='zero-tons-rows',
         columns=[{'name': i, 'id': i} for i in zero_tons_rows.columns],
         data=zero_tons_rows.to_dict('records')
     )
 
+@instrument('figure')
 def plot_tons_dists()->go.Figure:
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[df['ton'] != 0]
+    df = scan().select('ton').filter('ton', '!=', 0).collect()
 
     fig = go.Figure()
     fig.add_trace(
@@ -30,11 +37,11 @@ def plot_tons_dists()->go.Figure:
 
     return fig
 
+@instrument('figure')
 def plot_loaders_ton_dist()->go.Figure:
 
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[df['ton'] != 0]
-    df = df.groupby('loader')
+    df = scan().select('loader', 'ton').filter('ton', '!=', 0).collect()
+    df = df.groupby('loader', observed=True)
 
     fig = go.Figure()
     for loader in df.groups:
@@ -56,30 +63,20 @@ def plot_loaders_ton_dist()->go.Figure:
 
     return fig
 
+@instrument('figure')
 def plot_ton_statistics_by_charger_vs_time() -> html.Div:
     # Leer y procesar datos
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[['date', 'loader', 'ton']]
-    df = df[df['ton'] != 0]
-    df['date'] = pd.to_datetime(df['date'])
-
-    # Agregaciones
-    df = df.groupby(['date', 'loader']).agg(
-        sum=('ton', 'sum'),
-        min=('ton', 'min'),
-        max=('ton', 'max'),
-        mean=('ton', 'mean'),
-        median=('ton', 'median'),
-        Q1=('ton', lambda x: x.quantile(0.25)),
-        Q3=('ton', lambda x: x.quantile(0.75))
-    ).reset_index()
+    df = scan().filter('ton', '!=', 0).group_by('date', 'loader').agg(
+        **{statistic: ('ton', statistic) for statistic in ['count', 'sum', 'mean', 'min', 'max', 'Q1', 'Q3']}
+    ).collect()
+    df = df[df['count'] > 0]
 
     df = df.sort_values('date')
+    loaders = split_groups(df, 'loader')
 
     figs = []
     fig = go.Figure()
-    for loader in df['loader'].unique():
-        loader_data = df[df['loader'] == loader]
+    for loader, loader_data in loaders.items():
         fig.add_trace(
             go.Scatter(
                 x=loader_data['date'],
@@ -117,9 +114,7 @@ def plot_ton_statistics_by_charger_vs_time() -> html.Div:
 
     for stat, title in statistics:
         fig = go.Figure()
-        for loader in df['loader'].unique():
-            loader_data = df[df['loader'] == loader]
-
+        for loader, loader_data in loaders.items():
             fig.add_trace(
                 go.Scatter(
                     x=loader_data['date'],
@@ -145,13 +140,13 @@ Las distrubiciones de las toneladas cargadas por cada tipo de unidad son normale
 perfectas. Veamos la curva que describen al estandarizar los datos."""
 ]
 loaders_dists_analysis = [html.P(text) for text in loaders_dists_texts]
+@instrument('figure')
 def plot_loaders_tons_normalized_dists()->go.Figure:
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[df['ton'] != 0]
+    df = scan().select('loader', 'ton').filter('ton', '!=', 0).collect()
     mean = df['ton'].mean()
     std = df['ton'].std()
     df['ton'] = df['ton'].apply(lambda x: (x - mean) / std)
-    df = df.groupby('loader')
+    df = df.groupby('loader', observed=True)
     fig = go.Figure()
     for loader in df.groups:
         loader_data = df.get_group(loader)
@@ -190,6 +185,7 @@ presenta variaciones significativas en el tiempo y que acumuladas en el tiempo s
 una distribución normal."""
 analysis_2 = html.P(analysis_2_text)
     
+@instrument('layout')
 def layout()-> html.Div:
     return html.Div(
         id='loaders',
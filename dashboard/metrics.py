@@ -0,0 +1,41 @@
+import threading
+import time
+from flask import Response, g, request
+from data import config, render_metrics
+from data.metrics import log_memory, record
+
+CALLBACK_PATH = '/_dash-update-component'
+
+def register_metrics(app):
+    """
+    Records the Dash callbacks in the metrics, from the request to the response sent, and
+    serves the metrics at /metrics in the Prometheus text format. Logs the memory held by the
+    long-lived objects on the first request, once the sections are loaded and the server has
+    set up logging.
+    """
+    server = app.server
+    # Acquired by the first request and never released, so the memory is logged once
+    first_request = threading.Lock()
+
+    @server.before_request
+    def start_callback_timer():
+        if config.METRICS and first_request.acquire(blocking=False):
+            log_memory()
+        if config.METRICS and request.path == CALLBACK_PATH:
+            g.callback_start = time.perf_counter()
+
+    @server.after_request
+    def record_callback(response):
+        start = g.pop('callback_start', None)
+        if start is not None:
+            output = (request.get_json(silent=True) or {}).get('output')
+            # Only the outputs of the app, the requests must not create unbounded label values
+            name = output if output in app.callback_map else 'unknown'
+            size = None if response.direct_passthrough else len(response.get_data())
+            record('callback', name, time.perf_counter() - start,
+                   payload_bytes=size, error=response.status_code >= 400)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -9,6 +9,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+@instrument('figure')
 def graph_detailed_monthly_dist() -> go.Figure:
     daily_cycles = aggregate_daily_cycles()
     daily_cycles['month'] = daily_cycles['date'].dt.to_period('M').astype(str)
@@ -49,6 +50,7 @@ def graph_detailed_monthly_dist() -> go.Figure:
 
     return fig
 
+@instrument('figure')
 def graph_comparative_monthly_dist() -> go.Figure:
     
     daily_cycles = aggregate_daily_cycles()
@@ -73,6 +75,7 @@ def graph_comparative_monthly_dist() -> go.Figure:
      
     return go.Figure(graph)
 
+@instrument('figure')
 def graph_monthly_statistics() -> go.Figure:
     monthly_cycles = aggregate_monthly_cycles()
     monthly_cycles['month'] = monthly_cycles['month'].astype(str)
@@ -122,6 +125,7 @@ y 2024. La leve oscilación mencionada anteriormente se hace más visibe en esto
 
 monthly_distribution_analysis = [html.P(text) for text in monthly_distribution_analysis_texts]
 
+@instrument('layout')
 def layout() -> html.Div:
     section = html.Div(
         id='monthly-cycles-section',
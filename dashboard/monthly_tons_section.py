@@ -5,6 +5,7 @@ from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+@instrument('figure')
 def graph_detailed_monthly_dist() -> go.Figure:
     daily_tons = aggregate_daily_tons()
     daily_tons['month'] = daily_tons['date'].dt.to_period('M').astype(str)
@@ -45,6 +46,7 @@ def graph_detailed_monthly_dist() -> go.Figure:
 
     return fig
 
+@instrument('figure')
 def graph_comparative_monthly_dist() -> go.Figure:
     
     daily_tons = aggregate_daily_tons()
@@ -69,6 +71,7 @@ def graph_comparative_monthly_dist() -> go.Figure:
      
     return go.Figure(graph)
 
+@instrument('figure')
 def graph_monthly_statistics() -> go.Figure:
     monthly_tons = aggregate_monthly_tons()
     monthly_tons['month'] = monthly_tons['month'].astype(str)
@@ -116,6 +119,7 @@ varían según valores extremos y con una cantidad de ciclos que aumentan entre
 
 monthly_distribution_analysis = [html.P(text) for text in monthly_distribution_analysis_texts]
 
+@instrument('layout')
 def layout()->html.Div:
     section = html.Div(
         id='monthly-tons-section',
@@ -0,0 +1,169 @@
+import cProfile
+import datetime
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+from flask import abort, g, request, send_from_directory
+from data import config
+
+CALLBACK_PATH = '/_dash-update-component'
+# Output of the callback that builds the pages, the one profiled for the page URL's parameter
+PAGE_OUTPUT = 'page-content.children'
+# Profiles kept on disk, the oldest are deleted
+KEPT_PROFILES = 50
+# Seconds between samples, the interpreter switches threads every 5 ms by default
+SAMPLE_INTERVAL = 0.005
+
+class _Sampler(threading.Thread):
+    """
+    Sampling profiler of one thread: records its call stack at regular intervals. The result,
+    one line per distinct stack with the number of samples ('outer;inner count'), is the folded
+    format flame graph tools read (flamegraph.pl, speedscope, inferno).
+    """
+    def __init__(self, thread_id:int, interval:float=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id, self.interval = thread_id, interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ','))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self, path:Optional[str]=None)->None:
+        self.stopped.set()
+        self.join()
+        if path is None:
+            return
+        with open(path, 'w') as file:
+            for stack, samples in self.stacks.most_common():
+                file.write(f'{stack} {samples}\n')
+
+# Held while a cProfile runs, only one can be enabled at a time
+_cprofile_lock = threading.Lock()
+
+class _DeterministicProfiler:
+    """
+    cProfile of the calls made while a request runs, saved as a pstats file (snakeviz,
+    flameprof). From Python 3.12 cProfile hooks the whole process, so it also records the
+    other threads, and enabling a second one raises ValueError: start returns False while
+    another is running.
+    """
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self)->bool:
+        if not _cprofile_lock.acquire(blocking=False):
+            return False
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiling tool is active
+            _cprofile_lock.release()
+            return False
+        return True
+
+    def stop(self, path:Optional[str]=None)->None:
+        try:
+            self.profile.disable()
+        finally:
+            _cprofile_lock.release()
+        if path is not None:
+            self.profile.dump_stats(path)
+
+PROFILERS = {'sampling': '.folded', 'cprofile': '.prof'}
+
+def requested_profiler()->Optional[str]:
+    """
+    Profiler requested for the current request, with the X-Profile header or the profile query
+    parameter: 'cprofile', or 'sampling' for any other value. The Dash renderer requests the
+    callbacks of a page from a script, the parameter is then read from the page URL it sends as
+    referrer, so opening /daily-cycles?profile=1 profiles the build of that page: only its
+    page-content callback, not the other callbacks of the page load.
+    """
+    value = request.headers.get('X-Profile') or request.args.get('profile')
+    if value is None and request.path == CALLBACK_PATH and request.referrer:
+        body = request.get_json(silent=True) or {}
+        if body.get('output') == PAGE_OUTPUT:
+            value = parse_qs(urlsplit(request.referrer).query).get('profile', [None])[0]
+    if not value:
+        return None
+    return value if value in PROFILERS else 'sampling'
+
+def _profile_name(profiler:str)->str:
+    """
+    File name of a profile: when, and the page or callback profiled.
+    """
+    subject = request.path
+    if request.path == CALLBACK_PATH:
+        body = request.get_json(silent=True) or {}
+        inputs = body.get('inputs') or []
+        subject = body.get('output', '') + ''.join(f"-{item.get('value')}" for item in inputs if isinstance(item, dict))
+    subject = re.sub(r'[^A-Za-z0-9_.-]+', '-', subject).strip('-')[:80] or 'root'
+    timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return f'{timestamp}-{subject}{PROFILERS[profiler]}'
+
+def _remove_old_profiles()->None:
+    names = sorted(name for name in os.listdir(config.PROFILES_PATH) if name.endswith(tuple(PROFILERS.values())))
+    for name in names[:-KEPT_PROFILES]:
+        os.remove(os.path.join(config.PROFILES_PATH, name))
+
+def register_profiling(app):
+    """
+    When data.config.PROFILING is on, profiles the requests that ask for it (see
+    requested_profiler), such as the callback that builds a page. The response is the normal
+    one, with an X-Profile header giving the URL of the profile, stored in
+    data.config.PROFILES_PATH. A cProfile requested while another request is being profiled
+    with it falls back to the sampler. Does nothing otherwise.
+    """
+    if not config.PROFILING:
+        return
+    server = app.server
+
+    @server.before_request
+    def start_profile():
+        profiler = requested_profiler()
+        if profiler is None or request.path.startswith('/_profiles/'):
+            return
+        if profiler == 'cprofile':
+            g.profiler = _DeterministicProfiler()
+            if not g.profiler.start():
+                profiler = 'sampling'
+        if profiler == 'sampling':
+            g.profiler = _Sampler(threading.get_ident())
+            g.profiler.start()
+        g.profile_name = _profile_name(profiler)
+
+    @server.after_request
+    def save_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            os.makedirs(config.PROFILES_PATH, exist_ok=True)
+            profiler.stop(os.path.join(config.PROFILES_PATH, g.profile_name))
+            _remove_old_profiles()
+            response.headers['X-Profile'] = f'/_profiles/{g.profile_name}'
+        return response
+
+    @server.teardown_request
+    def discard_profile(error):
+        # Requests that end without a response, so the cProfile lock is always released
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+
+    @server.route('/_profiles/<name>')
+    def profile_file(name):
+        if not name.endswith(tuple(PROFILERS.values())):
+            abort(404)
+        return send_from_directory(os.path.abspath(config.PROFILES_PATH), name, as_attachment=True)
@@ -1,10 +1,12 @@
 from typing import List
+import numpy as np
 import pandas as pd
-from data import aggregate_daily_active_trucks, aggregate_trucks_daily_tons, CAEX61_comparison
+from data import fleet_matrix, fleet_daily_statistics, aggregate_daily_active_trucks, CAEX61_comparison, instrument, track_memory
 import plotly.graph_objs as go
 from dash import html, dcc
 from dash.dependencies import Output, Input
 
+@instrument('figure')
 def graph_daily_trucks_vs_time()->go.Figure:
     """
     Graphs the number of daily active trucks over time
@@ -28,6 +30,7 @@ def graph_daily_trucks_vs_time()->go.Figure:
 
     return fig
 
+@instrument('transformation')
 def get_trucks_daily_cycles_statistics(only_active_trucks:bool)->pd.DataFrame:
     """
     Returns the daily cycles statistics across all the trucks.
@@ -40,25 +43,18 @@ def get_trucks_daily_cycles_statistics(only_active_trucks:bool)->pd.DataFrame:
     pd.DataFrame: DataFrame with the daily cycles statistics
     """
     
-    daily_trucks_activity = aggregate_trucks_daily_tons(only_active_trucks=only_active_trucks)
-    daily_trucks_activity = daily_trucks_activity.groupby(['date'])['total_daily_cycles']
-    daily_trucks_activity = daily_trucks_activity.agg([
-        'mean',
-        'median',
-        'min',
-        'max',
-        lambda x: x.quantile(0.25),
-        lambda x: x.quantile(0.75)
-    ])
-    daily_trucks_activity.columns = ['mean', 'median', 'min', 'max', 'Q1', 'Q3']
-    daily_trucks_activity = daily_trucks_activity.reset_index()
-    daily_trucks_activity['date'] = pd.to_datetime(daily_trucks_activity['date'])
+    cycles, dates, _ = fleet_matrix('cycles')
+    daily_trucks_activity = fleet_daily_statistics(cycles, dates, only_active_trucks,
+                                                   ['mean', 'median', 'min', 'max', 'Q1', 'Q3'])
 
     return daily_trucks_activity
 
 active_trucks_daily_activity = get_trucks_daily_cycles_statistics(only_active_trucks=True)
 all_trucks_daily_activity = get_trucks_daily_cycles_statistics(only_active_trucks=False)
+track_memory('trucks_daily_cycles_section.active_trucks_daily_activity', lambda: active_trucks_daily_activity)
+track_memory('trucks_daily_cycles_section.all_trucks_daily_activity', lambda: all_trucks_daily_activity)
 
+@instrument('figure')
 def graph_trucks_daily_cycles_satistics()->go.Figure:
     """
     Graphs the selected statistics of the daily cycles of the trucks
@@ -97,14 +93,13 @@ def graph_trucks_daily_cycles_satistics()->go.Figure:
 
     return fig
 
+@instrument('figure')
 def graph_total_cycles_per_truck()->go.Figure:
     """
     Graphs the total cycles per truck
     """
-    daily_trucks_activity = aggregate_trucks_daily_tons(only_active_trucks=False)
-    daily_trucks_activity = daily_trucks_activity.drop(columns=['date'])
-    daily_trucks_activity = daily_trucks_activity.groupby(['truck']).agg('sum')
-    daily_trucks_activity = daily_trucks_activity.reset_index()
+    cycles, _, trucks = fleet_matrix('cycles')
+    daily_trucks_activity = pd.DataFrame({'truck': trucks, 'total_daily_cycles': np.nansum(cycles, axis=0).astype('int64')})
     daily_trucks_activity = daily_trucks_activity.sort_values(by='total_daily_cycles')
 
     fig = go.Figure()
@@ -151,13 +146,15 @@ El camión CAEX61 es el con menos ciclos realizados en todo el periodo. Analizar
 que es un camión nuevo en la flota"""
 analysis_3 = html.P(analysis_3_text)
 
+@instrument('figure')
 def plot_trucks_longevity()->go.Figure:
 
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[['date', 'truck']]
-    df['date'] = pd.to_datetime(df['date'])
-    max_date = df['date'].max()
-    df = df.groupby('truck')['date'].agg(['min','size'])
+    cycles, dates, trucks = fleet_matrix('cycles')
+    active = ~np.isnan(cycles)
+    max_date = dates[-1]
+    df = pd.DataFrame({'min': dates[active.argmax(axis=0)], 'size': np.nansum(cycles, axis=0).astype('int64')},
+                      index=pd.CategoricalIndex(trucks, categories=trucks, name='truck'))
+    df = df[active.any(axis=0)]
     df = df.sort_values(by='size')
     df['longevity'] = max_date - df['min']
     df['longevity'] = df['longevity'].dt.days
@@ -184,6 +181,7 @@ Sin embargo, la cantidad de ciclos diarios es muy baja en comparación con el re
 analizaremos cómo se compara con el resto de los camiones."""
 analysis_4 = html.P(analysis_4_text)
 
+@instrument('figure')
 def graph_CAEX61_comparison()->go.Figure:
     """
     Graphs the comparison of the CAEX61 truck with the rest of the trucks
@@ -228,6 +226,7 @@ ciclos."""
 analysis_5 = html.P(analysis_5_text)
 
 
+@instrument('layout')
 def layout()->html.Div:
     return html.Div(
 
@@ -1,21 +1,27 @@
-import pandas as pd
-from data import aggregate_trucks_daily_tons
+from data import scan, aggregate_trucks_daily_tons, instrument
 import plotly.graph_objs as go
 from dash import html, dcc, dash_table
 import plotly.express as px
 
+@instrument('figure')
 def zero_tons_rows_table()->dash_table.DataTable:
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    zero_tons_rows = df[df['ton'] == 0]
+    zero_tons_rows = scan().filter('ton', '==', 0).collect()
+    # Only dates and codes as text for the JSON, the metrics stay numbers so they sort as such
+    zero_tons_rows['date'] = zero_tons_rows['date'].dt.strftime('%Y-%m-%d')
+    for column in zero_tons_rows.select_dtypes('category').columns:
+        zero_tons_rows[column] = zero_tons_rows[column].astype(str)
+    for column in zero_tons_rows.select_dtypes('float32').columns:
+        # float32 values widened as written in the dataset, 273.61 rather than 273.6099853515625
+        zero_tons_rows[column] = zero_tons_rows[column].astype('float64').round(2)
     return dash_table.DataTable(
         id='zero-tons-rows',
         columns=[{'name': i, 'id': i} for i in zero_tons_rows.columns],
         data=zero_tons_rows.to_dict('records')
     )
 
+@instrument('figure')
 def graph_tons_distribution()->go.Figure:
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[df['ton'] != 0]
+    df = scan().select('ton').filter('ton', '!=', 0).collect()
     fig = go.Figure()
     fig.add_trace(
         go.Histogram(
@@ -38,12 +44,12 @@ toneladas: Q1, Q2, Q3, promedio, suma ) para cada día, promediadas entre todos
 graph_intro = html.P(graph_intro_text)
 
 
+@instrument('figure')
 def graph_daily_trucks_tons_statistics():
     daily_trucks_activity = aggregate_trucks_daily_tons(only_active_trucks=True)
     daily_trucks_activity = daily_trucks_activity.drop(columns=['truck'])
     daily_trucks_activity = daily_trucks_activity.groupby(['date']).agg('mean')
     daily_trucks_activity = daily_trucks_activity.reset_index()
-    daily_trucks_activity['date'] = pd.to_datetime(daily_trucks_activity['date'])
 
     fig = go.Figure()
     for col, name, show in [('total_daily_cycles', 'Ciclos diarios', False), 
@@ -70,9 +76,9 @@ def graph_daily_trucks_tons_statistics():
     return fig
 
 
+@instrument('figure')
 def graph_daily_trucks_tons_heatmap():
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[df['ton'] != 0]
+    df = scan().select('date', 'ton').filter('ton', '!=', 0).collect()
     df = df.sort_values(by='date')
 
     fig = px.density_heatmap(
@@ -92,12 +98,11 @@ def graph_daily_trucks_tons_heatmap():
 
     return fig
 
+@instrument('figure')
 def graph_monthly_total_tons_violins():
 
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df['date'] = pd.to_datetime(df['date'])
-    df['month'] = df['date'].dt.to_period('M').astype(str)
-    df = df[df['ton'] != 0][['month', 'ton']]
+    df = scan().select('date', 'ton').filter('ton', '!=', 0).collect()
+    df = df.assign(month=df['date'].dt.to_period('M').astype(str))[['month', 'ton']]
     
     fig = go.Figure()
     fig.add_trace(
@@ -136,6 +141,7 @@ más en el tiempo, bandas como 20 de Agosto de 2023 presentan una mayor std, una
 mientras que en 26 de Noviembre de 2023 a 9 de Diciembre de 2023 se observa clara concentración."""
 
 
+@instrument('layout')
 def layout()->html.Div:
     return html.Div(
 
@@ -1,12 +1,14 @@
-import pandas as pd
+from data import scan, instrument
 import plotly.graph_objs as go
 from dash import html, dcc, dash_table
 import plotly.express as px
 
+@instrument('figure')
 def plot_truck_vs_loader_tons():
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-    df = df[df['ton'] != 0]
-    df = df.groupby(['truck', 'loader']).agg('sum').reset_index()
+    df = scan().filter('ton', '!=', 0).group_by('truck', 'loader').agg(
+        count=('ton', 'count'), ton=('ton', 'sum')
+    ).collect()
+    df = df[df['count'] > 0]
     fig = px.scatter(df, x='truck', y='loader', size='ton', color='ton')
     fig.update_layout(
         title='Toneladas transportadas por camión y cargador',
@@ -15,6 +17,7 @@ def plot_truck_vs_loader_tons():
     )
     return fig
 
+@instrument('layout')
 def layout()-> html.Div:
     return html.Div(
         id='truck-loader-tons',
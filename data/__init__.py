@@ -1 +1,9 @@
+from .load_dataset import load_dataset, load_date_range, clear_dataset_cache
+from .date_index import slice_dates
+from .query import scan
+from .cube import load_cube, build_cube, rollup, rollup_dataset, clear_cube_cache
+from .statistics import grouped_statistics
+from .fleet_matrix import fleet_matrix, append_days, fleet_daily_statistics
+from .parallel import split_groups, map_groups
+from .metrics import instrument, render_metrics, track_memory
 from .transformations import *
\ No newline at end of file
@@ -0,0 +1,78 @@
+import json
+import os
+from typing import Dict, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .load_dataset import DATASET_PATH, dataset_version
+
+VERSION_FILE = 'version.json'
+
+def aggregates_path(path:str)->str:
+    """
+    Directory of the aggregates of a CSV dataset, written by data.ingest.
+    """
+    return os.path.splitext(path)[0] + '.aggregates'
+
+def _stored_version(store_path:str)->Optional[List[int]]:
+    version_path = os.path.join(store_path, VERSION_FILE)
+    if not os.path.exists(version_path):
+        return None
+    with open(version_path) as file:
+        return json.load(file)
+
+def _month_file(path:str, name:str, month:str)->str:
+    return os.path.join(aggregates_path(path), name, f'{month}.parquet')
+
+def _stored_months(path:str, name:str)->List[str]:
+    aggregate_path = os.path.join(aggregates_path(path), name)
+    if not os.path.isdir(aggregate_path):
+        return []
+    return sorted(file[:-len('.parquet')] for file in os.listdir(aggregate_path) if file.endswith('.parquet'))
+
+def aggregate_months(name:str, path:str=DATASET_PATH)->Optional[List[str]]:
+    """
+    Months of an aggregate persisted by data.ingest, if it is up to date with the dataset.
+    Aggregates are stored one file per month, so that new rows only rewrite their months.
+
+    Args:
+    name: Name of the aggregate
+    path: Path of the CSV dataset it was computed from
+
+    Returns:
+    Optional[List[str]]: The persisted months, YYYY-MM in order, or None when nothing was
+    persisted or the dataset changed since, callers then compute it from the raw rows
+    """
+    version = dataset_version(path)
+    if version is None or _stored_version(aggregates_path(path)) != version:
+        return None
+    return _stored_months(path, name) or None
+
+def read_aggregate(name:str, months:List[str], path:str=DATASET_PATH)->Dict[str, pa.Table]:
+    """
+    Reads months of a persisted aggregate, as listed by aggregate_months.
+    """
+    return {month: pq.read_table(_month_file(path, name, month)) for month in months}
+
+def save_aggregate(name:str, months:Dict[str, pa.Table], path:str=DATASET_PATH, replace:bool=False)->None:
+    """
+    Persists months of an aggregate computed from the current version of the dataset.
+
+    Args:
+    name: Name of the aggregate
+    months: YYYY-MM -> the aggregate of that month
+    path: Path of the CSV dataset it was computed from
+    replace: If True months is the whole aggregate and the other persisted months are
+    deleted, else they are kept as they are
+    """
+    store_path = aggregates_path(path)
+    os.makedirs(os.path.join(store_path, name), exist_ok=True)
+    for month, table in months.items():
+        month_path = _month_file(path, name, month)
+        pq.write_table(table, month_path + '.tmp')
+        os.replace(month_path + '.tmp', month_path)
+    if replace:
+        for month in set(_stored_months(path, name)) - set(months):
+            os.remove(_month_file(path, name, month))
+
+    with open(os.path.join(store_path, VERSION_FILE), 'w') as file:
+        json.dump(dataset_version(path), file)
@@ -0,0 +1,24 @@
+import importlib
+from types import ModuleType
+from typing import Optional
+from . import config
+
+# Execution backends of the transformations, selected with data.config.BACKEND:
+# - pandas: aggregations of the cube (see data.cube)
+# - duckdb: multi-threaded SQL queries over the dataset file (see data.duckdb_backend)
+# - polars: multi-threaded, streaming Polars lazy queries over the dataset file (see
+#   data.polars_backend)
+# The duckdb and polars backends require their package and implement the same functions:
+# daily_totals, daily_active_trucks, daily_truck_cycles, rollup, truck_comparison and
+# monthly_statistics
+BACKENDS = ['pandas', 'duckdb', 'polars']
+
+def active_backend()->Optional[ModuleType]:
+    """
+    Module of the backend configured in data.config.BACKEND, None for pandas.
+    """
+    if config.BACKEND not in BACKENDS:
+        raise ValueError(f'Unknown backend {config.BACKEND}, expected one of {BACKENDS}')
+    if config.BACKEND == 'pandas':
+        return None
+    return importlib.import_module(f'.{config.BACKEND}_backend', __package__)
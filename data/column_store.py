@@ -0,0 +1,124 @@
+import json
+import os
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+METADATA_FILE = 'metadata.json'
+
+def column_store_path(path:str)->str:
+    """
+    Directory of the column store copy of a CSV dataset, written by data.convert_dataset.
+    """
+    return os.path.splitext(path)[0] + '.columns'
+
+def _codes_dtype(n_categories:int)->np.dtype:
+    """
+    Integer type pandas uses for the codes of a categorical with n_categories categories,
+    storing the codes with it lets them be mapped without a conversion.
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _read_metadata(store_path:str)->Dict:
+    with open(os.path.join(store_path, METADATA_FILE)) as file:
+        return json.load(file)
+
+def _write_metadata(store_path:str, metadata:Dict)->None:
+    # Replaced atomically, readers see either the previous or the new row count
+    temporary_path = os.path.join(store_path, METADATA_FILE + '.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump(metadata, file)
+    os.replace(temporary_path, os.path.join(store_path, METADATA_FILE))
+
+def _column_values(series:pd.Series, column:Dict)->np.ndarray:
+    if 'categories' in column:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.set_categories(column['categories']).cat.codes
+        else:
+            codes = pd.Categorical(series, categories=column['categories']).codes
+        return np.asarray(codes, dtype=column['dtype'])
+    return series.to_numpy(dtype=column['dtype'])
+
+def write_column_store(df:pd.DataFrame, store_path:str)->None:
+    """
+    Writes a frame as a column store: one raw binary file per column plus a metadata file with
+    the row count, the column types and the categories of the categorical columns (stored as
+    their codes). The metadata is written last, so readers never see a half-written store.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    columns = []
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            categories = list(df[name].cat.categories)
+            column = {'name': name, 'dtype': _codes_dtype(len(categories)).str, 'categories': categories}
+        else:
+            column = {'name': name, 'dtype': df[name].dtype.str}
+        _column_values(df[name], column).tofile(os.path.join(store_path, f'{name}.bin'))
+        columns.append(column)
+
+    _write_metadata(store_path, {'rows': len(df), 'columns': columns})
+
+def append_column_store(df:pd.DataFrame, store_path:str)->None:
+    """
+    Appends the rows of a frame to a column store, writing only the new rows. Unseen truck or
+    loader codes are added at the end of their categories, so the stored codes stay valid.
+    """
+    metadata = _read_metadata(store_path)
+    for column in metadata['columns']:
+        column_path = os.path.join(store_path, f"{column['name']}.bin")
+        series = df[column['name']]
+        if 'categories' in column:
+            known = set(column['categories'])
+            new_categories = sorted(set(series.dropna().unique()) - known)
+            column['categories'] = column['categories'] + new_categories
+            codes_dtype = _codes_dtype(len(column['categories'])).str
+            if codes_dtype != column['dtype']:
+                # More codes than the stored integer type holds, the column is rewritten wider
+                # into a new file, processes still mapping the old one keep reading it
+                stored = np.fromfile(column_path, dtype=column['dtype'], count=metadata['rows'])
+                stored.astype(codes_dtype).tofile(column_path + '.tmp')
+                os.replace(column_path + '.tmp', column_path)
+                column['dtype'] = codes_dtype
+
+        with open(column_path, 'r+b') as file:
+            file.seek(metadata['rows'] * np.dtype(column['dtype']).itemsize)
+            file.truncate()
+            _column_values(series, column).tofile(file)
+
+    metadata['rows'] += len(df)
+    _write_metadata(store_path, metadata)
+
+def store_columns(store_path:str)->List[str]:
+    """
+    Names of the columns in a column store.
+    """
+    return [column['name'] for column in _read_metadata(store_path)['columns']]
+
+def read_column_store(store_path:str, columns:List[str])->pd.DataFrame:
+    """
+    Maps the requested columns of a column store read-only into a DataFrame, without copying.
+
+    The pages are backed by the files, so every process mapping the same store (e.g. the
+    dashboard workers) shares a single copy of the data in the OS page cache.
+    """
+    metadata = _read_metadata(store_path)
+    stored = {column['name']: column for column in metadata['columns']}
+
+    data = {}
+    for name in columns:
+        column = stored[name]
+        if metadata['rows']:
+            array = np.memmap(os.path.join(store_path, f'{name}.bin'), dtype=column['dtype'],
+                              mode='r', shape=(metadata['rows'],))
+        else:
+            array = np.empty(0, dtype=column['dtype'])
+        if 'categories' in column:
+            dtype = pd.CategoricalDtype(column['categories'])
+            data[name] = pd.Categorical.from_codes(array, dtype=dtype, validate=False)
+        else:
+            data[name] = array
+
+    return pd.DataFrame(data, index=pd.RangeIndex(metadata['rows']), copy=False)
@@ -0,0 +1,39 @@
+import os
+
+# Settings of the data layer. Defaults can be overridden with environment variables, or by
+# assigning the attributes before the data is first loaded.
+
+# CSV of the haul dataset, its copies and persisted aggregates are stored next to it
+DATASET_PATH = os.environ.get('HAUL_DATASET_PATH', 'files/timeseries_haul_loading_data.csv')
+
+# Rows read at a time when building the cube. If None the whole dataset is loaded in memory,
+# else it is streamed in chunks of this size and peak memory no longer grows with its length
+CHUNK_SIZE = int(os.environ['HAUL_CHUNK_SIZE']) if os.environ.get('HAUL_CHUNK_SIZE') else None
+
+# Accuracy of the quantile sketches of the cube (see data.sketch): cells with more values are
+# compressed to at most SKETCH_COMPRESSION / 2 + 1 centroids. A cell is a truck at a loader in
+# one day, a few cycles, so it is sized to them: the cube stops growing with the cycles per cell
+# once they pass it, while the quartiles of a truck's day still merge tens of centroids.
+# 0 keeps every value, quantiles are then exact but the cube grows with the dataset
+SKETCH_COMPRESSION = int(os.environ.get('HAUL_SKETCH_COMPRESSION', 16))
+
+# Worker processes for the work that is split by group (see data.parallel), such as building
+# the cube one month per process. 1 runs everything in the dashboard process
+PROCESSES = int(os.environ.get('HAUL_PROCESSES', 1))
+
+# Engine the transformations run on: pandas over the cube, or duckdb or polars over the dataset
+# file (see data.backends)
+BACKEND = os.environ.get('HAUL_BACKEND', 'pandas')
+
+# Whether calls of the transformations, figures, layouts and callbacks are recorded for the
+# /metrics route of the dashboard (see data.metrics)
+METRICS = os.environ.get('HAUL_METRICS', '1') != '0'
+
+# Whether the section layouts measure the memory they allocate at their peak while being
+# built, with tracemalloc, which slows down every allocation while it runs (see data.metrics)
+MEMORY_TRACING = os.environ.get('HAUL_MEMORY_TRACING', '0') == '1'
+
+# Whether requests can ask to be profiled, with the X-Profile header or the profile query
+# parameter (see dashboard.profiling), and where the profiles are stored
+PROFILING = os.environ.get('HAUL_PROFILING', '0') == '1'
+PROFILES_PATH = os.path.join(os.path.dirname(DATASET_PATH), 'profiles')
@@ -0,0 +1,60 @@
+import argparse
+from typing import List, Sequence
+import pandas as pd
+from .column_store import column_store_path, write_column_store
+from .load_dataset import DATASET_PATH, columnar_path
+from .month_partitions import partitions_path, write_partitions
+from .schema import apply_schema, read_types
+
+FORMATS = ['parquet', 'columns', 'months']
+
+def convert_dataset(path:str=DATASET_PATH, formats:Sequence[str]=('parquet',))->List[str]:
+    """
+    Writes typed copies of the CSV dataset next to it, with the types declared in data.schema.
+
+    - parquet: truck and loader are dictionary encoded, date is stored as a timestamp and
+    metrics as float32
+    - columns: a column store of raw binary files that dashboard workers memory-map and share
+    (see data.column_store)
+    - months: one Parquet file per month, load_date_range reads only the months of the
+    requested period (see data.month_partitions)
+
+    load_dataset reads these copies instead of the CSV while they are not older than the CSV,
+    so run the conversion again after the CSV is updated. Rows are written sorted by date.
+
+    Args:
+    path: Path of the CSV dataset
+    formats: Formats to write, any of FORMATS
+
+    Returns:
+    List[str]: Paths of the written copies
+    """
+    df = apply_schema(pd.read_csv(path, dtype=read_types()))
+    # Sorted by date, so load_dataset maps the copies without sorting them (see slice_dates)
+    df = df.sort_values('date', kind='stable', ignore_index=True)
+
+    written = []
+    if 'parquet' in formats:
+        parquet_path = columnar_path(path)
+        df.to_parquet(parquet_path, index=False)
+        written.append(parquet_path)
+    if 'columns' in formats:
+        store_path = column_store_path(path)
+        write_column_store(df, store_path)
+        written.append(store_path)
+    if 'months' in formats:
+        store_path = partitions_path(path)
+        write_partitions(df, store_path)
+        written.append(store_path)
+
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Writes typed copies of the haul dataset')
+    # Validated here, argparse rejects an empty list against choices
+    parser.add_argument('formats', nargs='*', help=f"any of {', '.join(FORMATS)}, parquet if none is given")
+    args = parser.parse_args()
+    for unknown in set(args.formats) - set(FORMATS):
+        parser.error(f'invalid format: {unknown}')
+    for written_path in convert_dataset(formats=args.formats or ['parquet']):
+        print(f'Dataset written to {written_path}')
@@ -0,0 +1,460 @@
+import threading
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from . import config
+from .backends import active_backend
+from .aggregate_store import aggregate_months, aggregates_path, read_aggregate, save_aggregate
+from .load_dataset import DATASET_PATH, dataset_source, dataset_version, file_version, iter_dataset, load_dataset
+from .date_index import slice_dates
+from .metrics import track_memory
+from .parallel import map_groups, split_groups
+from .schema import METRIC_COLUMNS
+from .sketch import compress
+from .statistics import grouped_quantiles
+
+CUBE_KEYS = ['date', 'truck', 'loader']
+
+# Per metric columns of a cell. Statistics are over the non-zero values of the metric, zeros
+# are only counted: most analyses discard them as bad records, the rest add them back.
+# - count: non-zero values
+# - zeros: zero values
+# - sum, sumsq: sum and sum of squares of the values
+# - min, max: extremes of the values
+# - start, centroids: where the quantile sketch of the values (see data.sketch) is in the
+#   cube's summaries, and its number of centroids. Sketches of several cells are merged to get
+#   the quantiles of any group of cells. Cells with fewer values than the compression keep each
+#   value as a centroid of weight 1
+CELL_STATISTICS = ['count', 'zeros', 'sum', 'sumsq', 'min', 'max', 'start', 'centroids']
+
+# Summaries are stored in the metrics' type, they are float32 in the dataset
+SUMMARY_TYPE = 'float32'
+
+class Cube(pd.DataFrame):
+    """
+    Cells of (date, truck, loader), as returned by build_cube. The sketches of the cells are
+    stored apart, in summaries: per metric, the centroids of every cell in one flat array and
+    their weights in another (None when they are all 1, for exact values). Weights count the
+    values of the centroids, they are stored in the narrowest unsigned type. An array per cell
+    would take more memory than the values it holds. Frames derived from a cube, such as a
+    slice of its dates or a filter of its trucks, share its summaries.
+    """
+    _metadata = ['summaries']
+    summaries: Optional[Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]]] = None
+
+    @property
+    def _constructor(self):
+        return Cube
+
+# Process-wide cache of the cube of a dataset: (source, source version, cube). The source is
+# the persisted aggregates when they are up to date, else the raw dataset it is built from
+_cache: Dict[str, Tuple[str, Tuple[int, int], Cube]] = {}
+_cache_lock = threading.Lock()
+track_memory('cube._cache', lambda: _cache)
+
+def _cube_columns(metrics:List[str])->List[str]:
+    return CUBE_KEYS + ['cycles'] + [f'{metric}_{statistic}' for metric in metrics for statistic in CELL_STATISTICS]
+
+def _cell_types(metrics:List[str])->Dict[str, str]:
+    """
+    Narrowest types of the columns of the cells: a cube has about as many cells as the dataset
+    has rows. Sums stay float64 for their precision.
+    """
+    types = {'cycles': 'int32'}
+    for metric in metrics:
+        types.update({f'{metric}_count': 'int32', f'{metric}_zeros': 'int32', f'{metric}_min': SUMMARY_TYPE,
+                      f'{metric}_max': SUMMARY_TYPE, f'{metric}_centroids': 'int32'})
+    return types
+
+def _centroid_index(cube:Cube, metric:str)->np.ndarray:
+    """
+    Positions in the summaries of the centroids of the cells of a cube, cell after cell.
+    """
+    starts = cube[f'{metric}_start'].to_numpy()
+    lengths = cube[f'{metric}_centroids'].to_numpy()
+    return np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+
+def _cell_summaries(cube:Cube, metric:str)->Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+    """
+    The centroids of the cells of a cube.
+
+    Returns:
+    Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]: values, weights (None if they are all
+    1) and the position of the cell of each value
+    """
+    values, weights = cube.summaries[metric]
+    index = _centroid_index(cube, metric)
+    positions = np.repeat(np.arange(len(cube)), cube[f'{metric}_centroids'].to_numpy())
+    return (values[index].astype('float64'), None if weights is None else weights[index].astype('float64'),
+            positions)
+
+def _compression(compression:Optional[int])->int:
+    return config.SKETCH_COMPRESSION if compression is None else compression
+
+def _summarize(columns:Dict[str, Any], summaries:Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]],
+               metric:str, values:np.ndarray, weights:np.ndarray, cell_ids:np.ndarray, n_cells:int,
+               compression:int)->None:
+    """
+    Summarizes the weighted values of each of n_cells cells, as a sketch of at most compression
+    centroids, with compression 0 values are kept as they are. Adds the '{metric}_start' and
+    '{metric}_centroids' columns to columns and the summary to summaries. Weights are only kept
+    if some aren't 1: cells with fewer values than the compression are not compressed.
+    """
+    if compression:
+        values, weights, cell_ids = compress(values, weights, cell_ids, n_cells, compression)
+    else:
+        order = np.lexsort((values, cell_ids))
+        values, weights, cell_ids = values[order], weights[order], cell_ids[order]
+
+    starts = np.searchsorted(cell_ids, np.arange(n_cells))
+    columns[f'{metric}_start'] = starts
+    columns[f'{metric}_centroids'] = np.diff(np.append(starts, len(values)))
+    weights = weights.astype(np.min_scalar_type(int(weights.max()))) if (weights != 1).any() else None
+    summaries[metric] = (values.astype(SUMMARY_TYPE), weights)
+
+def _assemble_cube(columns:Dict[str, Any], metrics:List[str],
+                   summaries:Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]])->Cube:
+    """
+    Builds a cube from its columns in one go, typed as _cell_types.
+    """
+    types = _cell_types(metrics)
+    cube = Cube({column: columns[column].astype(types[column], copy=False) if column in types else columns[column]
+                 for column in _cube_columns(metrics)}, copy=False)
+    cube.summaries = summaries
+    return cube
+
+def build_cube(df:pd.DataFrame, metrics:Optional[List[str]]=None,
+               compression:Optional[int]=None)->Cube:
+    """
+    Aggregates haul cycles into cells of (date, truck, loader).
+
+    Args:
+    df: Haul cycles
+    metrics: Metrics to summarize, every metric column of df if None
+    compression: Maximum centroids of the sketches of the cells, data.config.SKETCH_COMPRESSION
+    if None. 0 keeps all the values
+
+    Returns:
+    Cube: One row per (date, truck, loader) with cycles, the number of cycles of the cell, and
+    a '{metric}_{statistic}' column for each metric and CELL_STATISTICS
+    """
+    if metrics is None:
+        metrics = [metric for metric in METRIC_COLUMNS if metric in df.columns]
+
+    grouped = df.groupby(CUBE_KEYS, observed=True, sort=True)
+    group_ids = grouped.ngroup().to_numpy()
+    columns = dict(grouped.size().reset_index(name='cycles').items())
+    n_cells = len(columns['cycles'])
+    summaries = {}
+
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype='float64')
+        zero = values == 0
+        nonzero = np.where(zero, np.nan, values)
+        by_cell = pd.DataFrame({'value': nonzero, 'square': nonzero ** 2, 'zero': zero}).groupby(group_ids)
+
+        columns[f'{metric}_count'] = by_cell['value'].count().to_numpy()
+        columns[f'{metric}_zeros'] = by_cell['zero'].sum().to_numpy()
+        columns[f'{metric}_sum'] = by_cell['value'].sum().to_numpy()
+        columns[f'{metric}_sumsq'] = by_cell['square'].sum().to_numpy()
+        columns[f'{metric}_min'] = by_cell['value'].min().to_numpy()
+        columns[f'{metric}_max'] = by_cell['value'].max().to_numpy()
+        valid = ~np.isnan(nonzero)
+        _summarize(columns, summaries, metric, nonzero[valid], np.ones(valid.sum()), group_ids[valid],
+                   n_cells, _compression(compression))
+
+    return _assemble_cube(columns, metrics, summaries)
+
+def _unify_categories(cubes:List[Cube])->List[Cube]:
+    for key in ['truck', 'loader']:
+        dtype = pd.CategoricalDtype(sorted(set().union(*(cube[key].cat.categories for cube in cubes))))
+        cubes = [cube if cube[key].dtype == dtype else cube.assign(**{key: cube[key].astype(dtype)}) for cube in cubes]
+    return cubes
+
+def concat_cubes(cubes:List[Cube])->Cube:
+    """
+    Concatenates cubes without cells in common, such as the cubes of different months, with
+    their summaries.
+    """
+    cubes = _unify_categories(cubes)
+    cube = Cube(pd.concat([pd.DataFrame(part) for part in cubes], ignore_index=True))
+    cube.summaries = {}
+    for metric in cubes[0].summaries:
+        indexes = [_centroid_index(part, metric) for part in cubes]
+        values = np.concatenate([part.summaries[metric][0][index] for part, index in zip(cubes, indexes)])
+        weights = None
+        if any(part.summaries[metric][1] is not None for part in cubes):
+            # Cells without weights hold single values, centroids of weight 1
+            weights = np.concatenate([np.ones(len(index), dtype='uint8') if part.summaries[metric][1] is None
+                                      else part.summaries[metric][1][index] for part, index in zip(cubes, indexes)])
+        lengths = cube[f'{metric}_centroids'].to_numpy()
+        cube[f'{metric}_start'] = np.cumsum(lengths) - lengths
+        cube.summaries[metric] = (values, weights)
+    return cube
+
+def merge_cubes(cubes:List[Cube], compression:Optional[int]=None)->Cube:
+    """
+    Merges cubes built from disjoint sets of cycles, cells with the same key are combined.
+
+    Args:
+    cubes: Cubes to merge
+    compression: Maximum centroids of the merged sketches, data.config.SKETCH_COMPRESSION if
+    None. 0 keeps all the centroids
+    """
+    cube = concat_cubes(cubes)
+    metrics = list(cube.summaries)
+
+    cells = cube.groupby(CUBE_KEYS, observed=True, sort=True)
+    cell_ids = cells.ngroup().to_numpy()
+    aggregations = {'cycles': 'sum'}
+    for metric in metrics:
+        for statistic in ('count', 'zeros', 'sum', 'sumsq'):
+            aggregations[f'{metric}_{statistic}'] = 'sum'
+        aggregations[f'{metric}_min'] = 'min'
+        aggregations[f'{metric}_max'] = 'max'
+    merged = dict(pd.DataFrame(cells.agg(aggregations)).reset_index().items())
+    n_cells = len(merged['cycles'])
+    summaries = {}
+
+    for metric in metrics:
+        values, weights, positions = _cell_summaries(cube, metric)
+        if weights is None:
+            weights = np.ones(len(values))
+        _summarize(merged, summaries, metric, values, weights, cell_ids[positions], n_cells,
+                   _compression(compression))
+
+    return _assemble_cube(merged, metrics, summaries)
+
+def stream_cube(chunk_size:int, compression:Optional[int]=None, path:str=DATASET_PATH)->Cube:
+    """
+    Builds the cube of the whole dataset reading it in chunks. The dataset is sorted by date
+    (its copies always are, see data.convert_dataset), so the cells of every date of a chunk
+    but the last are complete: they are set aside as they are, and only the cells of the last
+    date are merged with those of the next chunk. Rows of a date already set aside, as in an
+    unsorted CSV, are merged in at the end. Counts, sums, min and max are exact, the quantiles
+    come from the sketches.
+
+    Time grows with the rows and not with the number of chunks. Peak memory is a chunk and its
+    cube on top of the cells set aside, which grow with the number of cells and the
+    compression but not with the cycles per cell.
+
+    Args:
+    chunk_size: Rows per chunk
+    compression: Maximum centroids per cell and metric, data.config.SKETCH_COMPRESSION if None
+    path: Path of the CSV dataset
+    """
+    done, late, last = [], [], None
+    for chunk in iter_dataset(chunk_size, path=path):
+        cube = build_cube(chunk, compression=compression)
+        if last is not None:
+            boundary = last['date'].iloc[0]
+            dates = cube['date'].to_numpy()
+            before = dates < boundary.to_datetime64()
+            if before.any():
+                late.append(cube[before])
+                cube, dates = cube[~before], dates[~before]
+            if cube.empty:
+                continue
+            at_boundary = dates == boundary.to_datetime64()
+            # Cells are sorted by date, the boundary ones first
+            if at_boundary.any():
+                cube = concat_cubes([merge_cubes([last, cube[at_boundary]], compression), cube[~at_boundary]])
+            else:
+                cube = concat_cubes([last, cube])
+        last_date = cube['date'].to_numpy()[-1]
+        is_last = (cube['date'] == last_date).to_numpy()
+        done.append(cube[~is_last])
+        last = cube[is_last]
+
+    if last is None:
+        return None
+    cube = concat_cubes(done + [last])
+    if late:
+        cube = merge_cubes([cube] + late, compression)
+    return cube
+
+def _month_cube(compression:int, month:pd.Period, rows:pd.DataFrame)->Cube:
+    return build_cube(rows, compression=compression)
+
+def parallel_cube(processes:int, compression:Optional[int]=None, path:str=DATASET_PATH)->Cube:
+    """
+    Builds the cube of the whole dataset with the cube of each month built in its own process
+    (see data.parallel.map_groups). Months share no cell, so the merged cube is the one
+    build_cube returns: the month cubes are concatenated in order.
+
+    Args:
+    processes: Worker processes
+    compression: Maximum centroids per cell and metric, data.config.SKETCH_COMPRESSION if None
+    path: Path of the CSV dataset
+    """
+    df = load_dataset(path=path, cache=False)
+    months = df['date'].dt.to_period('M')
+    cubes = map_groups(partial(_month_cube, _compression(compression)), df, months, processes)
+    return concat_cubes([cubes[month] for month in sorted(cubes)])
+
+def compute_cube(path:str=DATASET_PATH)->Cube:
+    """
+    Builds the cube of the whole dataset, streaming it when data.config.CHUNK_SIZE is set and
+    one month per process when data.config.PROCESSES is more than 1. The raw rows are not
+    kept in the load_dataset cache, the cube replaces them.
+    """
+    if config.CHUNK_SIZE:
+        return stream_cube(config.CHUNK_SIZE, path=path)
+    if config.PROCESSES > 1:
+        return parallel_cube(config.PROCESSES, path=path)
+    return build_cube(load_dataset(path=path, cache=False))
+
+def _cube_table(cube:Cube)->pa.Table:
+    """
+    A cube as an Arrow table, to persist it: the sketches of the cells are list columns,
+    '{metric}_values' and '{metric}_weights', whose flat values are the summaries.
+    """
+    metrics = list(cube.summaries)
+    summary_columns = [f'{metric}_{statistic}' for metric in metrics for statistic in ('start', 'centroids')]
+    table = pa.Table.from_pandas(pd.DataFrame(cube).drop(columns=summary_columns), preserve_index=False)
+    for metric in metrics:
+        index = _centroid_index(cube, metric)
+        lengths = cube[f'{metric}_centroids'].to_numpy()
+        offsets = pa.array(np.concatenate([[0], np.cumsum(lengths)]).astype('int32'))
+        values, weights = cube.summaries[metric]
+        table = table.append_column(f'{metric}_values', pa.ListArray.from_arrays(offsets, pa.array(values[index])))
+        if weights is not None:
+            table = table.append_column(f'{metric}_weights', pa.ListArray.from_arrays(offsets, pa.array(weights[index])))
+    return table
+
+def _table_cube(table:pa.Table)->Cube:
+    """
+    Cube persisted by _cube_table. The flat values of the list columns are used as they are,
+    without a copy.
+    """
+    metrics = [name[:-len('_values')] for name in table.column_names if name.endswith('_values')]
+    summary_columns = [name for name in table.column_names if name.endswith(('_values', '_weights'))]
+    cube = Cube(table.drop_columns(summary_columns).to_pandas())
+    cube.summaries = {}
+    for metric in metrics:
+        cells = table.column(f'{metric}_values').combine_chunks()
+        offsets = cells.offsets.to_numpy()
+        weights = None
+        if f'{metric}_weights' in table.column_names:
+            weights = table.column(f'{metric}_weights').combine_chunks().flatten().to_numpy()
+        cube[f'{metric}_start'] = offsets[:-1] - offsets[0]
+        cube[f'{metric}_centroids'] = np.diff(offsets)
+        cube.summaries[metric] = (cells.flatten().to_numpy(), weights)
+    return cube[_cube_columns(metrics)]
+
+def save_cube(cube:Cube, path:str=DATASET_PATH, replace:bool=True)->None:
+    """
+    Persists the cube of a dataset, one file per month (see data.aggregate_store).
+
+    Args:
+    cube: Cube computed from the current version of the dataset
+    path: Path of the CSV dataset
+    replace: If True cube is the whole cube, else only its months are rewritten and the other
+    persisted months are kept
+    """
+    months = cube['date'].dt.strftime('%Y-%m')
+    save_aggregate('cube', {month: _cube_table(cells) for month, cells in split_groups(cube, months).items()},
+                   path, replace)
+
+def read_cube(months:List[str], path:str=DATASET_PATH)->Cube:
+    """
+    Reads months of the persisted cube of a dataset, as listed by aggregate_months.
+    """
+    tables = read_aggregate('cube', months, path)
+    return concat_cubes([_table_cube(tables[month]) for month in months])
+
+def load_cube(path:str=DATASET_PATH)->Cube:
+    """
+    Loads the cube of the whole dataset: the one persisted by data.ingest when it is up to
+    date, else the one built from the raw dataset (see compute_cube), once per dataset version.
+
+    The returned frame is shared, callers must not modify it in place.
+    """
+    months = aggregate_months('cube', path)
+    if months is not None:
+        source, version = aggregates_path(path), tuple(dataset_version(path))
+    else:
+        source = dataset_source(path)
+        version = file_version(source)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[:2] == (source, version):
+            return cached[2]
+        cube = compute_cube(path) if months is None else read_cube(months, path)
+        _cache[path] = (source, version, cube)
+
+    return cube
+
+def clear_cube_cache()->None:
+    """
+    Drops the cached cubes, the next load_cube call loads them again.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+def rollup(cube:Cube, by:List[str], metric:str, include_zeros:bool=True,
+           quantiles:bool=False)->pd.DataFrame:
+    """
+    Statistics of a metric over the cycles of each group of cells.
+
+    Args:
+    cube: Cube, as returned by build_cube or load_cube
+    by: Keys to group by, any of CUBE_KEYS
+    metric: Metric to summarize
+    include_zeros: If False, cycles where the metric is 0 are discarded
+    quantiles: If True, the median and quartiles are computed too, from the merged sketches of
+    the cells of each group. Exact if the cells' sketches are
+
+    Returns:
+    pd.DataFrame: One row per group with by and:
+    - count, int: cycles with a value for the metric
+    - sum, mean, std, min, max, float: statistics of the metric
+    - Q1, median, Q3, float: quartiles of the metric, only if quantiles is True
+    """
+    grouped = cube.groupby(by, observed=True, sort=True)
+    stats = grouped.agg(
+        count=(f'{metric}_count', 'sum'),
+        zeros=(f'{metric}_zeros', 'sum'),
+        sum=(f'{metric}_sum', 'sum'),
+        sumsq=(f'{metric}_sumsq', 'sum'),
+        min=(f'{metric}_min', 'min'),
+        max=(f'{metric}_max', 'max'),
+    ).astype({'count': 'int64', 'zeros': 'int64', 'min': 'float64', 'max': 'float64'})
+    if include_zeros:
+        stats['count'] += stats['zeros']
+        has_zeros = stats['zeros'] > 0
+        stats['min'] = stats['min'].where(~has_zeros, np.fmin(stats['min'], 0))
+        stats['max'] = stats['max'].where(~has_zeros, np.fmax(stats['max'], 0))
+
+    count = stats['count'].where(stats['count'] > 0)
+    stats['mean'] = stats['sum'] / count
+    variance = (stats['sumsq'] - stats['sum'] ** 2 / count) / (count - 1)
+    stats['std'] = np.sqrt(variance.clip(lower=0))
+
+    if quantiles:
+        cell_groups = grouped.ngroup().to_numpy()
+        values, weights, positions = _cell_summaries(cube, metric)
+        group_ids = cell_groups[positions]
+        if include_zeros:
+            zeros = cube[f'{metric}_zeros'].to_numpy()
+            values = np.concatenate([values, np.zeros(zeros.sum())])
+            if weights is not None:
+                weights = np.concatenate([weights, np.ones(zeros.sum())])
+            group_ids = np.concatenate([group_ids, np.repeat(cell_groups, zeros)])
+        quartiles = grouped_quantiles(values, group_ids, len(stats), [0.25, 0.5, 0.75], weights)
+        stats['Q1'], stats['median'], stats['Q3'] = quartiles
+
+    return pd.DataFrame(stats.drop(columns=['zeros', 'sumsq'])).reset_index()
+
+def rollup_dataset(by:List[str], metric:str, include_zeros:bool=True, quantiles:bool=False,
+                   start:Optional[pd.Timestamp]=None, path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    rollup of the whole dataset, or of its days since start, on its cube or by the backend
+    configured in data.config.BACKEND (see data.backends).
+    """
+    backend = active_backend()
+    if backend is not None:
+        return backend.rollup(by, metric, include_zeros, quantiles, start, path)
+    return rollup(slice_dates(load_cube(path), start), by, metric, include_zeros, quantiles)
\ No newline at end of file
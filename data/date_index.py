@@ -0,0 +1,34 @@
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+def date_order(dates:pd.Series)->Optional[np.ndarray]:
+    """
+    Permutation that sorts rows by date, keeping their order within a day. None if they are
+    sorted already, as in the copies written by data.convert_dataset.
+    """
+    if dates.is_monotonic_increasing:
+        return None
+    return np.argsort(dates.to_numpy(), kind='stable')
+
+def slice_dates(df:pd.DataFrame, start:Optional[pd.Timestamp]=None,
+                end:Optional[pd.Timestamp]=None)->pd.DataFrame:
+    """
+    Rows with start <= date < end of a frame sorted by date, such as load_dataset's or a cube.
+
+    The sorted date column is the index: the bounds are found by binary search on it, in
+    O(log n), and the rows are returned as a contiguous slice of the frame, without copying
+    them.
+
+    Args:
+    df: Frame sorted by its date column
+    start: First date, unbounded if None
+    end: Date after the last one, unbounded if None
+
+    Returns:
+    pd.DataFrame: The rows of the period, a view of df
+    """
+    dates = df['date'].to_numpy()
+    first = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).to_datetime64(), side='left')
+    last = len(df) if end is None else np.searchsorted(dates, pd.Timestamp(end).to_datetime64(), side='left')
+    return df.iloc[first:last]
@@ -0,0 +1,149 @@
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+import pandas as pd
+from .load_dataset import DATASET_PATH, current_parquet
+from .schema import METRIC_COLUMNS, apply_schema
+
+# DuckDB backend of the transformations (see data.backends): SQL queries, run multi-threaded
+# over the Parquet copy of the dataset or the CSV
+
+_connection = None
+_connection_lock = threading.Lock()
+
+def _cursor():
+    global _connection
+    import duckdb
+    with _connection_lock:
+        if _connection is None:
+            _connection = duckdb.connect()
+    # A cursor per query, connections are not shared between threads
+    return _connection.cursor()
+
+def _query(sql:str, path:str, parameters:Sequence[Any]=())->pd.DataFrame:
+    """
+    Runs a query over the dataset, referenced as `dataset` in the SQL, and returns its result
+    typed as declared in data.schema.
+    """
+    parquet_path = current_parquet(path)
+    if parquet_path is not None:
+        dataset = 'read_parquet(?)'
+        parameters = [parquet_path, *parameters]
+    else:
+        types = {column: 'FLOAT' for column in METRIC_COLUMNS}
+        types['date'] = 'DATE'
+        dataset = f'read_csv(?, header=true, types={types})'
+        parameters = [path, *parameters]
+
+    cursor = _cursor()
+    try:
+        return apply_schema(cursor.execute(f'WITH dataset AS (SELECT * FROM {dataset}) {sql}', parameters).df())
+    finally:
+        cursor.close()
+
+def daily_totals(path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Cycles and tons of each day.
+
+    Returns:
+    pd.DataFrame: date, daily_cycles and daily_tons, as in aggregate_daily_and_monthly
+    """
+    return _query("""
+        SELECT date, count(*) AS daily_cycles, coalesce(sum(ton), 0) AS daily_tons
+        FROM dataset GROUP BY date ORDER BY date
+    """, path)
+
+def daily_active_trucks(path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Trucks with cycles each day.
+
+    Returns:
+    pd.DataFrame: date and daily_active_trucks, as in aggregate_daily_active_trucks
+    """
+    return _query("""
+        SELECT date, count(DISTINCT truck) AS daily_active_trucks
+        FROM dataset GROUP BY date ORDER BY date
+    """, path)
+
+def daily_truck_cycles(path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Cycles of each truck each day it was active.
+
+    Returns:
+    pd.DataFrame: date, truck and daily_cycles, sorted by date and truck
+    """
+    return _query("""
+        SELECT date, truck, count(*) AS daily_cycles
+        FROM dataset GROUP BY date, truck ORDER BY date, truck
+    """, path)
+
+def rollup(by:List[str], metric:str, include_zeros:bool=True, quantiles:bool=False,
+           start:Optional[pd.Timestamp]=None, path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Statistics of a metric over the cycles of each group, the SQL version of data.cube.rollup
+    on the cube of the whole dataset, or of its days since start. Quantiles are exact.
+
+    Returns:
+    pd.DataFrame: As returned by data.cube.rollup
+    """
+    keys = ', '.join(by)
+    values = metric if include_zeros else f'nullif({metric}, 0)'
+    period, parameters = '', []
+    if start is not None:
+        period, parameters = 'WHERE date >= CAST(? AS DATE)', [pd.Timestamp(start).strftime('%Y-%m-%d')]
+    quartiles = ''
+    if quantiles:
+        quartiles = ''.join(f', quantile_cont({values}, {quantile}) AS {name}'
+                            for name, quantile in (('Q1', 0.25), ('median', 0.5), ('Q3', 0.75)))
+    return _query(f"""
+        SELECT {keys}, count({values}) AS count, coalesce(sum({values}), 0) AS sum,
+            min({values}) AS min, max({values}) AS max, avg({values}) AS mean,
+            stddev_samp({values}) AS std{quartiles}
+        FROM dataset {period} GROUP BY {keys} ORDER BY {keys}
+    """, path, parameters)
+
+def truck_comparison(truck:str, path:str=DATASET_PATH)->Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Daily cycles of a truck and statistics of the daily cycles of the other active trucks.
+
+    Returns:
+    Tuple[pd.DataFrame, pd.DataFrame]: As returned by CAEX61_comparison
+    """
+    daily = 'SELECT truck, date, count(*) AS daily_cycles FROM dataset GROUP BY truck, date'
+    truck_daily = _query(f"""
+        SELECT date, daily_cycles FROM ({daily}) WHERE truck = ? ORDER BY date
+    """, path, [truck])
+    other_trucks = _query(f"""
+        SELECT date, avg(daily_cycles) AS mean, quantile_cont(daily_cycles, 0.5) AS median,
+            quantile_cont(daily_cycles, 0.25) AS Q1, quantile_cont(daily_cycles, 0.75) AS Q3,
+            min(daily_cycles) AS min
+        FROM ({daily}) WHERE truck != ? GROUP BY date ORDER BY date
+    """, path, [truck])
+    return truck_daily, other_trucks
+
+def monthly_statistics(daily:pd.DataFrame, column:str)->pd.DataFrame:
+    """
+    Statistics of a daily total per month.
+
+    Args:
+    daily: date and the column, as returned by aggregate_daily_cycles or aggregate_daily_tons
+
+    Returns:
+    pd.DataFrame: As returned by aggregate_monthly_cycles
+    """
+    cursor = _cursor()
+    try:
+        cursor.register('daily', daily[['date', column]])
+        monthly = cursor.execute(f"""
+            SELECT strftime(date, '%Y-%m') AS month, sum({column}) AS sum, avg({column}) AS mean,
+                quantile_cont({column}, 0.5) AS median, stddev_samp({column}) AS std,
+                min({column}) AS min, max({column}) AS max, quantile_cont({column}, 0.25) AS Q1,
+                quantile_cont({column}, 0.75) AS Q3
+            FROM daily GROUP BY month ORDER BY month
+        """).df()
+    finally:
+        cursor.close()
+
+    if daily[column].dtype.kind in 'iu':
+        for statistic in ('sum', 'min', 'max'):
+            monthly[statistic] = monthly[statistic].astype(daily[column].dtype)
+    return monthly
@@ -0,0 +1,173 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .backends import active_backend
+from .cube import load_cube, rollup
+from .load_dataset import DATASET_PATH, dataset_version
+from .metrics import track_memory
+from .statistics import QUANTILES, STATISTICS
+
+# Fleet matrices of whole datasets: (metric, agg_func, include_zeros, path) -> (dataset version,
+# rows, days, trucks). rows has spare rows past the last day, for the days ingest appends
+_matrices: Dict[Tuple[str, str, bool, str], Tuple[Optional[List[int]], np.ndarray, pd.DatetimeIndex, pd.Index]] = {}
+_matrices_lock = threading.Lock()
+track_memory('fleet_matrix._matrices', lambda: _matrices)
+
+def _daily_values(metric:str, agg_func:str, include_zeros:bool, cube:Optional[pd.DataFrame],
+                  path:str)->Tuple[pd.DataFrame, pd.DatetimeIndex, pd.Index]:
+    """
+    Value of each truck each day, from the cube or, for the whole dataset, the backend.
+
+    Returns:
+    Tuple[pd.DataFrame, pd.DatetimeIndex, pd.Index]: date, truck and value of the trucks with
+    a value, every day of the cells (sorted) and the trucks (the truck categories)
+    """
+    backend = active_backend()
+    if cube is None and backend is not None:
+        if metric == 'cycles':
+            daily = backend.daily_truck_cycles(path).rename(columns={'daily_cycles': 'value'})
+        else:
+            daily = backend.rollup(['date', 'truck'], metric, include_zeros, path=path)
+        days, trucks = daily['date'], daily['truck'].cat.categories
+    else:
+        if cube is None:
+            cube = load_cube(path)
+        if metric == 'cycles':
+            daily = cube.groupby(['date', 'truck'], observed=True)['cycles'].sum().reset_index(name='value')
+        else:
+            daily = rollup(cube, ['date', 'truck'], metric, include_zeros)
+        days, trucks = cube['date'], cube['truck'].cat.categories
+
+    if metric != 'cycles':
+        daily = daily[daily['count'] > 0].rename(columns={agg_func: 'value'})
+    return daily, pd.DatetimeIndex(np.sort(days.unique())), trucks
+
+def _rows(daily:pd.DataFrame, dates:pd.DatetimeIndex, trucks:pd.Index)->np.ndarray:
+    values = np.full((len(dates), len(trucks)), np.nan)
+    values[dates.get_indexer(daily['date']), trucks.get_indexer(daily['truck'])] = daily['value'].to_numpy()
+    return values
+
+def fleet_matrix(metric:str='cycles', agg_func:str='sum', include_zeros:bool=True,
+                 cube:pd.DataFrame=None, path:str=DATASET_PATH)->Tuple[np.ndarray, pd.DatetimeIndex, pd.Index]:
+    """
+    Daily value of every truck of the fleet as a dense days x trucks matrix, the shape the
+    fleet statistics are computed on: a day's statistics are reductions along its row.
+
+    The matrix of the whole dataset is cached until the dataset changes. The days appended by
+    data.ingest are added to it as new rows (see append_days), it is only rebuilt when they
+    bring new trucks. It is shared, callers must not modify it in place.
+
+    Args:
+    metric: cycles, or any metric of the cube (ton, distance_empty, truck_total_cycle, ...)
+    agg_func: sum or mean, how the values of a metric are aggregated per truck and day.
+    Ignored for cycles, which are counted
+    include_zeros: If False, cycles where the metric is 0 are discarded
+    cube: Cube of the haul cycles, as returned by build_cube. If None, the whole dataset
+    path: Path of the CSV dataset, when cube is None
+
+    Returns:
+    Tuple[np.ndarray, pd.DatetimeIndex, pd.Index]: the float matrix, NaN where the truck had
+    no value that day, its days (sorted) and its trucks (the truck categories)
+    """
+    if cube is not None:
+        daily, dates, trucks = _daily_values(metric, agg_func, include_zeros, cube, path)
+        return _rows(daily, dates, trucks), dates, trucks
+
+    key = (metric, agg_func, include_zeros, path)
+    version = dataset_version(path)
+    with _matrices_lock:
+        cached = _matrices.get(key)
+        if cached is None or cached[0] != version:
+            daily, dates, trucks = _daily_values(metric, agg_func, include_zeros, None, path)
+            cached = (version, _rows(daily, dates, trucks), dates, trucks)
+            _matrices[key] = cached
+    _, rows, dates, trucks = cached
+    return rows[:len(dates)], dates, trucks
+
+def append_days(cube:pd.DataFrame, previous_version:Optional[List[int]], path:str=DATASET_PATH)->None:
+    """
+    Updates the cached fleet matrices of a dataset with the days of newly appended haul
+    cycles, without rebuilding them. Each new day is one row, written in the spare rows of the
+    matrix, which doubles its rows when it runs out of them. The rows of days the matrix
+    already has (late arrivals) are replaced, in a copy since the matrix is shared. A matrix
+    is dropped instead, and rebuilt on its next use, when the cycles bring trucks it doesn't
+    have or a new day before its last one.
+
+    Args:
+    cube: Cells of the days of the new haul cycles, with all the cycles of those days
+    previous_version: Version of the dataset before they were appended, matrices of other
+    versions are left to be rebuilt
+    path: Path of the CSV dataset
+    """
+    version = dataset_version(path)
+    with _matrices_lock:
+        for key in [key for key in _matrices if key[3] == path]:
+            cached_version, rows, dates, trucks = _matrices.pop(key)
+            metric, agg_func, include_zeros, _ = key
+            daily, new_dates, new_trucks = _daily_values(metric, agg_func, include_zeros, cube, path)
+            known = dates.get_indexer(new_dates)
+            appended = new_dates[known < 0]
+            if cached_version != previous_version or (trucks.get_indexer(new_trucks) < 0).any() \
+                    or (len(dates) and len(appended) and appended[0] <= dates[-1]):
+                continue
+
+            values = _rows(daily, new_dates, trucks)
+            days = len(dates)
+            capacity = len(rows) if days + len(appended) <= len(rows) else max(2 * len(rows), days + len(appended))
+            if (known >= 0).any() or capacity > len(rows):
+                # The rows handed out are never modified, only the spare ones past them
+                grown = np.full((capacity, len(trucks)), np.nan)
+                grown[:days] = rows[:days]
+                rows = grown
+            rows[known[known >= 0]] = values[known >= 0]
+            rows[days:days + len(appended)] = values[known < 0]
+            _matrices[key] = (version, rows, dates.append(appended), trucks)
+
+def fleet_daily_statistics(values:np.ndarray, dates:pd.DatetimeIndex, only_active_trucks:bool=True,
+                           statistics:Optional[List[str]]=None)->pd.DataFrame:
+    """
+    Statistics of the trucks' values of each day, as reductions along the rows of a fleet
+    matrix. Inactive trucks are masked out, or counted as 0.
+
+    Args:
+    values, dates: Fleet matrix and its days, as returned by fleet_matrix
+    only_active_trucks: If True, only the trucks with a value that day are considered. Else,
+    every truck of the fleet adds a 0 on the days it wasn't active
+    statistics: Statistics to compute, any of data.statistics.STATISTICS in the requested
+    order. All if None
+
+    Returns:
+    pd.DataFrame: A DataFrame with the days with values, containing:
+    - date, datetime: day
+    - count, int: number of trucks considered
+    - sum, mean, std (ddof=1), min, Q1, median, Q3, max, float: statistics of their values,
+    quantiles interpolated linearly
+    """
+    if statistics is None:
+        statistics = STATISTICS
+    if not only_active_trucks:
+        values = np.nan_to_num(values, nan=0)
+
+    count = (~np.isnan(values)).sum(axis=1)
+    total = np.nansum(values, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        variance = np.nansum((values - mean[:, np.newaxis]) ** 2, axis=1) / (count - 1)
+    computed = {'count': count, 'sum': total, 'mean': mean, 'std': np.sqrt(variance)}
+
+    # NaN are sorted last, so the values of a day are the first count of its sorted row
+    sorted_values = np.sort(values, axis=1)
+    rows = np.arange(len(values))
+    last = np.maximum(count - 1, 0)
+    for statistic in statistics:
+        if statistic not in QUANTILES:
+            continue
+        position = last * QUANTILES[statistic]
+        below = np.floor(position).astype('int64')
+        above = np.minimum(below + 1, last)
+        low, high = sorted_values[rows, below], sorted_values[rows, above]
+        computed[statistic] = low + (high - low) * (position - below)
+
+    daily_statistics = pd.DataFrame({'date': dates, **{statistic: computed[statistic] for statistic in statistics}})
+    return daily_statistics[count > 0].reset_index(drop=True)
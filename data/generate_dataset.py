@@ -0,0 +1,226 @@
+import argparse
+import os
+import shutil
+from typing import Dict, List, Sequence
+import numpy as np
+import pandas as pd
+from .column_store import append_column_store, column_store_path, write_column_store
+from .convert_dataset import FORMATS
+from .load_dataset import columnar_path
+from .month_partitions import append_partitions, partitions_path, write_partitions
+from .schema import DATE_TYPE, METRIC_COLUMNS, METRIC_TYPE
+
+# Where synthetic datasets are written by default, apart from the real dataset so generating
+# one doesn't replace it and its copies. The dashboard reads it with HAUL_DATASET_PATH
+SYNTHETIC_PATH = 'files/synthetic/timeseries_haul_loading_data.csv'
+
+# Loaders described by the analyses of the dashboard: empty distance routes (center in meters,
+# weight), mean tons, probabilities of 3, 4 and 5 shovels, and whether their truck cycles are
+# short (a clear peak at 1650 s) or long (flatter, around 3150 s). Further loaders get random
+# profiles
+LOADERS = {
+    'PH06': {'routes': [(5300, 6), (3600, 1), (6400, 1), (7600, 1)], 'ton': 298, 'shovels': [0.2, 0.6, 0.2], 'short_cycles': True},
+    'PH48': {'routes': [(7000, 3), (4500, 2), (5600, 2), (6300, 2), (8100, 1)], 'ton': 302, 'shovels': [0.35, 0.55, 0.1], 'short_cycles': False},
+    'PH55': {'routes': [(4000, 5), (5000, 2), (7400, 1)], 'ton': 300, 'shovels': [0.2, 0.6, 0.2], 'short_cycles': True},
+    'PH58': {'routes': [(7100, 4), (4800, 2), (6200, 2), (7900, 1)], 'ton': 301, 'shovels': [0.35, 0.55, 0.1], 'short_cycles': False},
+}
+
+# Routes longer than this are used much less once the new trucks join, the change in planning
+# the recent period analyses find
+LONG_ROUTE = 7000
+
+def _loader_profiles(n_loaders:int, rng:np.random.Generator)->Dict[str, Dict]:
+    profiles = dict(list(LOADERS.items())[:n_loaders])
+    for i in range(len(profiles), n_loaders):
+        centers = rng.uniform(3500, 8200, rng.integers(2, 6))
+        profiles[f'PH{60 + i:02d}'] = {
+            'routes': [(center, weight) for center, weight in zip(centers, rng.integers(1, 6, len(centers)))],
+            'ton': rng.normal(300, 2),
+            'shovels': list(rng.dirichlet([2, 6, 2])),
+            'short_cycles': bool(rng.integers(2)),
+        }
+    return profiles
+
+def _mixture(rng:np.random.Generator, components:np.ndarray, centers:np.ndarray, weights:np.ndarray,
+             spread:float)->np.ndarray:
+    """
+    Samples a mixture of normals per row: row i picks a component with probabilities
+    weights[components[i]] and draws around its center.
+    """
+    cumulative = np.cumsum(weights, axis=1) / weights.sum(axis=1, keepdims=True)
+    chosen = (rng.random(len(components))[:, np.newaxis] > cumulative[components]).sum(axis=1)
+    chosen = np.minimum(chosen, weights.shape[1] - 1)
+    return rng.normal(centers[components, chosen], spread)
+
+def _padded(rows:List[List[float]])->np.ndarray:
+    width = max(len(row) for row in rows)
+    return np.array([row + [0] * (width - len(row)) for row in rows], dtype='float64')
+
+def _categorical(names:List[str], codes:np.ndarray)->pd.Categorical:
+    """
+    Categorical of names[codes], with the sorted names as categories as in data.schema.
+    """
+    ranks = np.argsort(np.argsort(names))
+    return pd.Categorical.from_codes(ranks[codes], categories=sorted(names))
+
+def _month_rows(rng:np.random.Generator, days:pd.DatetimeIndex, trucks:List[str], joins:np.ndarray,
+                rates:np.ndarray, profiles:Dict[str, Dict], change:pd.Timestamp,
+                zero_ton_rate:float)->pd.DataFrame:
+    """
+    Haul cycles of some days: each active truck makes a Poisson number of cycles a day, each
+    with a random loader.
+    """
+    day_index, truck_index = np.meshgrid(np.arange(len(days)), np.arange(len(trucks)), indexing='ij')
+    day_index, truck_index = day_index.ravel(), truck_index.ravel()
+    active = days[day_index] >= joins[truck_index]
+    cycles = rng.poisson(rates[truck_index] * active)
+    day_index, truck_index = np.repeat(day_index, cycles), np.repeat(truck_index, cycles)
+    n = len(day_index)
+
+    names = list(profiles)
+    loader = rng.integers(len(names), size=n)
+    dates = days[day_index]
+    recent = np.asarray(dates >= change)
+
+    routes = [profiles[name]['routes'] for name in names]
+    centers = _padded([[center for center, _ in route] for route in routes])
+    weights = _padded([[weight for _, weight in route] for route in routes])
+    recent_weights = np.where(centers > LONG_ROUTE, weights * 0.3, weights)
+    distance_empty = np.where(recent,
+                              _mixture(rng, loader, centers, recent_weights, 120),
+                              _mixture(rng, loader, centers, weights, 120))
+
+    short = np.array([profiles[name]['short_cycles'] for name in names])
+    cycle_weights = np.where(short[:, np.newaxis], [[0.8, 0.2]], [[0.35, 0.65]])
+    cycle_centers = np.tile([[1650, 3150]], (len(names), 1))
+    truck_total_cycle = _mixture(rng, loader, cycle_centers, cycle_weights, 0) \
+        + rng.normal(0, np.where(short[loader], 250, 500))
+
+    ton = rng.normal(np.array([profiles[name]['ton'] for name in names])[loader], 15)
+    ton[rng.random(n) < zero_ton_rate] = 0
+
+    shovels = np.array([profiles[name]['shovels'] for name in names])
+    n_shovel = 3 + (rng.random(n)[:, np.newaxis] > np.cumsum(shovels, axis=1)[loader]).sum(axis=1)
+
+    # Nearly uniform between 200 and 400 seconds, slightly shifted per loader
+    loader_total_cycle = rng.uniform(200, 400, n) + rng.normal(np.linspace(0, 30, len(names))[loader], 25)
+
+    return pd.DataFrame({
+        'truck': _categorical(trucks, truck_index),
+        'loader': _categorical(names, loader),
+        'ton': np.maximum(ton, 0).round(2),
+        'n_shovel': n_shovel.astype('float64'),
+        'truck_total_cycle': np.maximum(truck_total_cycle, 300).round(1),
+        'loader_total_cycle': np.maximum(loader_total_cycle, 60).round(1),
+        'distance_empty': np.maximum(distance_empty, 100).round(1),
+        'distance_full': np.maximum(distance_empty * 0.4 + rng.normal(4200, 700, n), 500).round(1),
+        'date': dates,
+    })
+
+def generate_dataset(path:str=SYNTHETIC_PATH, trucks:int=40, loaders:int=4, days:int=547,
+                     start:str='2023-01-01', scale:float=1, new_trucks:int=1,
+                     zero_ton_rate:float=5e-5, formats:Sequence[str]=(), seed:int=0)->List[str]:
+    """
+    Writes a synthetic haul dataset with the shape the dashboard analyses describe, to test
+    and measure the dashboard without the real data.
+
+    - truck_total_cycle: bimodal, peaks at 1650 and 3150 seconds, short for half the loaders
+    - distance_empty: a mixture of routes per loader, long routes are less frequent after the
+    new trucks join
+    - ton: normal per loader around 300, with occasional zero ton records
+    - new trucks (CAEX61, CAEX62, ...) join in the last months with fewer daily cycles
+
+    The dataset is generated and written one month at a time, so its size is not bounded by
+    memory: scale 1 is about the size of the real dataset, 1000 writes a thousand times more
+    cycles per truck and day.
+
+    Args:
+    path: Path of the CSV to write, replaced with its typed copies if it exists
+    trucks: Trucks of the fleet from the start
+    loaders: Loaders
+    days: Days of the period
+    start: First day
+    scale: Multiplies the cycles per truck and day, about 3
+    new_trucks: Trucks that join after seven ninths of the period, 2024-03-01 with the defaults
+    zero_ton_rate: Share of records with 0 tons
+    formats: Typed copies to write along the CSV, any of data.convert_dataset.FORMATS
+    seed: Seed of the random generator, the same arguments write the same dataset
+
+    Returns:
+    List[str]: Paths of the written files
+    """
+    rng = np.random.default_rng(seed)
+    period = pd.date_range(start, periods=days, freq='D')
+    fleet = [f'CAEX{i:02d}' for i in range(1, trucks + 1)]
+    newcomers = [f'CAEX{i:02d}' for i in range(max(61, trucks + 1), max(61, trucks + 1) + new_trucks)]
+    change = period[len(period) * 7 // 9]
+
+    truck_names = fleet + newcomers
+    joins = np.array([period[0]] * len(fleet) + [change] * len(newcomers), dtype=DATE_TYPE)
+    rates = np.array([3.0] * len(fleet) + [1.2] * len(newcomers)) * scale
+    order = np.argsort(truck_names)
+    truck_names, joins, rates = [truck_names[i] for i in order], joins[order], rates[order]
+    profiles = _loader_profiles(loaders, rng)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    parquet_path, store_path, months_path = columnar_path(path), column_store_path(path), partitions_path(path)
+    for stale in (store_path, months_path):
+        if os.path.isdir(stale):
+            shutil.rmtree(stale)
+    if os.path.exists(parquet_path):
+        os.remove(parquet_path)
+
+    parquet_writer = None
+    written_rows = 0
+    try:
+        for _, month_days in pd.Series(period, index=period).groupby(period.to_period('M')):
+            df = _month_rows(rng, pd.DatetimeIndex(month_days), truck_names, joins, rates, profiles,
+                             change, zero_ton_rate)
+            df.to_csv(path, index=False, mode='w' if written_rows == 0 else 'a', header=written_rows == 0)
+            df = df.astype({**{column: METRIC_TYPE for column in METRIC_COLUMNS}, 'date': DATE_TYPE})
+            if 'parquet' in formats:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(parquet_path, table.schema)
+                parquet_writer.write_table(table)
+            if 'columns' in formats:
+                if written_rows == 0:
+                    write_column_store(df, store_path)
+                else:
+                    append_column_store(df, store_path)
+            if 'months' in formats:
+                if written_rows == 0:
+                    write_partitions(df, months_path)
+                else:
+                    append_partitions(df, months_path)
+            written_rows += len(df)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    copies = {'parquet': parquet_path, 'columns': store_path, 'months': months_path}
+    return [path] + [copies[name] for name in FORMATS if name in formats]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Writes a synthetic haul dataset')
+    parser.add_argument('formats', nargs='*', help=f"typed copies to write too, any of {', '.join(FORMATS)}")
+    parser.add_argument('--path', default=SYNTHETIC_PATH)
+    parser.add_argument('--trucks', type=int, default=40)
+    parser.add_argument('--loaders', type=int, default=4)
+    parser.add_argument('--days', type=int, default=547)
+    parser.add_argument('--start', default='2023-01-01')
+    parser.add_argument('--scale', type=float, default=1, help='multiplies the cycles per truck and day')
+    parser.add_argument('--new-trucks', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--force', action='store_true', help='replaces an existing dataset and its copies')
+    args = parser.parse_args()
+    if os.path.exists(args.path) and not args.force:
+        parser.error(f'{args.path} exists, pass --force to replace it and its copies')
+    for unknown in set(args.formats) - set(FORMATS):
+        parser.error(f'invalid format: {unknown}')
+
+    for written_path in generate_dataset(args.path, args.trucks, args.loaders, args.days, args.start,
+                                         args.scale, args.new_trucks, formats=args.formats, seed=args.seed):
+        print(f'Dataset written to {written_path}')
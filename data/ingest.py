@@ -0,0 +1,88 @@
+import argparse
+import os
+import pandas as pd
+from .aggregate_store import aggregate_months
+from .column_store import append_column_store, column_store_path
+from .cube import CUBE_KEYS, build_cube, compute_cube, concat_cubes, merge_cubes, read_cube, save_cube
+from .fleet_matrix import append_days
+from .load_dataset import DATASET_PATH, dataset_source, dataset_version, file_version
+from .month_partitions import append_partitions, partitions_path
+from .schema import apply_schema
+
+def build_aggregates(path:str=DATASET_PATH)->None:
+    """
+    Builds and persists the cube of the whole dataset. Needed once, and again if the CSV is
+    modified other than through ingest_batch.
+    """
+    save_cube(compute_cube(path), path)
+
+def _append_rows(batch:pd.DataFrame, typed_batch:pd.DataFrame, path:str)->None:
+    """
+    Appends the batch to the CSV, and to the column store and the month partitions when they
+    are up to date. The Parquet copy becomes older than the CSV, so it is ignored until
+    data.convert_dataset is run again.
+    """
+    store_path = column_store_path(path)
+    store_is_current = dataset_source(path) == store_path
+    months_path = partitions_path(path)
+    months_are_current = os.path.exists(months_path) and file_version(months_path)[0] >= file_version(path)[0]
+
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    with open(path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        ends_with_newline = file.read(1) == b'\n'
+    with open(path, 'a', newline='') as file:
+        if not ends_with_newline:
+            file.write('\n')
+        batch[columns].to_csv(file, header=False, index=False, date_format='%Y-%m-%d')
+
+    if store_is_current:
+        append_column_store(typed_batch, store_path)
+    if months_are_current:
+        append_partitions(typed_batch, months_path)
+
+def ingest_batch(batch:pd.DataFrame, path:str=DATASET_PATH)->None:
+    """
+    Appends new haul cycles to the dataset and updates the persisted cube.
+
+    Only the batch is aggregated and only the persisted months it falls in are read and
+    rewritten: the cells of the batch's dates are merged with the batch's cells, the other
+    cells are kept as they are. Rows for days already in the dataset (late arrivals) are
+    merged into the existing cells. The batch's days are updated in the cached fleet matrices.
+
+    Args:
+    batch: New haul cycles, with the dataset's columns
+    path: Path of the CSV dataset
+    """
+    months = aggregate_months('cube', path)
+    version = dataset_version(path)
+    batch = batch.assign(date=pd.to_datetime(batch['date']))
+    typed_batch = apply_schema(batch.copy())
+    _append_rows(batch, typed_batch, path)
+
+    if months is None:
+        # Nothing persisted yet, or the dataset was modified outside of ingest_batch
+        build_aggregates(path)
+        return
+
+    cube = build_cube(typed_batch)
+    batch_months = set(cube['date'].dt.strftime('%Y-%m'))
+    stored_months = [month for month in months if month in batch_months]
+    if stored_months:
+        stored = read_cube(stored_months, path)
+        affected = stored['date'].isin(cube['date'].unique()).to_numpy()
+        if affected.any():
+            cube = merge_cubes([stored[affected], cube])
+        cube = concat_cubes([stored[~affected], cube]).sort_values(CUBE_KEYS, ignore_index=True)
+    save_cube(cube, path, replace=False)
+    append_days(cube[cube['date'].isin(typed_batch['date'].unique())], version, path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Adds new haul cycles to the dataset')
+    parser.add_argument('batch', nargs='?', help='CSV file with the new haul cycles')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild the cube from the whole dataset')
+    args = parser.parse_args()
+    if args.batch:
+        ingest_batch(pd.read_csv(args.batch))
+    if args.rebuild or not args.batch:
+        build_aggregates()
@@ -1,6 +1,204 @@
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
 import pandas as pd
-def load_dataset()->pd.DataFrame:
-    df_path = 'files/timeseries_haul_loading_data.csv'
-    df = pd.read_csv(df_path)
-    df['date'] = pd.to_datetime(df['date'])
-    return df
\ No newline at end of file
+from . import config
+from .date_index import date_order, slice_dates
+from .column_store import METADATA_FILE, column_store_path, read_column_store, store_columns
+from .month_partitions import partition_columns, partitions_path, read_partitions
+from .metrics import track_memory
+from .schema import apply_schema, read_types
+
+DATASET_PATH = config.DATASET_PATH
+
+# Process-wide cache: path -> (source file, source version, source columns, order of the rows
+# by date or None if the source is sorted, columns loaded so far)
+_cache: Dict[str, Tuple[str, Tuple[int, int], List[str], Optional[np.ndarray], pd.DataFrame]] = {}
+_cache_lock = threading.Lock()
+track_memory('load_dataset._cache', lambda: _cache)
+
+def file_version(path:str)->Tuple[int, int]:
+    """
+    Version of a file on disk, changes whenever the file is rewritten or appended to. A column
+    store is versioned by its metadata file, which is rewritten on every write.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, METADATA_FILE)
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def columnar_path(path:str=DATASET_PATH)->str:
+    """
+    Path of the Parquet copy of a CSV dataset, written by data.convert_dataset.
+    """
+    return os.path.splitext(path)[0] + '.parquet'
+
+def _is_current(copy_path:str, path:str)->bool:
+    """
+    Whether a copy of the CSV dataset exists and is not older than the CSV.
+    """
+    if not os.path.exists(copy_path):
+        return False
+    return not os.path.exists(path) or file_version(copy_path)[0] >= file_version(path)[0]
+
+def dataset_source(path:str)->str:
+    """
+    File to read the dataset from: the column store, else the Parquet copy, when present and
+    not older than the CSV. The CSV otherwise.
+    """
+    for source in (column_store_path(path), columnar_path(path)):
+        if _is_current(source, path):
+            return source
+    return path
+
+def current_parquet(path:str=DATASET_PATH)->Optional[str]:
+    """
+    Path of the Parquet copy of a CSV dataset if it is present and not older than the CSV.
+    """
+    parquet_path = columnar_path(path)
+    return parquet_path if _is_current(parquet_path, path) else None
+
+def _source_columns(source:str)->List[str]:
+    if os.path.isdir(source):
+        return store_columns(source)
+    if source.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_schema(source).names
+    return list(pd.read_csv(source, nrows=0).columns)
+
+def _read_columns(source:str, columns:List[str])->pd.DataFrame:
+    if os.path.isdir(source):
+        # Stored with the schema types, mapped as is to keep it zero-copy
+        return read_column_store(source, columns)
+    if source.endswith('.parquet'):
+        df = pd.read_parquet(source, columns=columns)
+    else:
+        df = pd.read_csv(source, usecols=columns, dtype=read_types())[columns]
+    return apply_schema(df)
+
+def load_dataset(columns:Optional[List[str]]=None, path:str=DATASET_PATH, cache:bool=True)->pd.DataFrame:
+    """
+    Loads the haul dataset, reading each column only once per process.
+
+    The dataset is read from its column store or Parquet copy when one is available (see
+    data.convert_dataset) and from the CSV otherwise. Loaded columns are cached and handed to
+    every caller, they are read again only when the source file's mtime or size changes. The
+    returned frame is shared, callers must not modify it in place (derive new frames instead).
+
+    Rows are sorted by date, so periods can be selected with slice_dates. The copies are
+    written sorted and mapped as they are, an unsorted CSV is sorted once when read.
+
+    Args:
+    columns: Columns to load, all of them if None. Only the missing ones are read from disk.
+    path: Path of the CSV dataset
+    cache: If False, the columns that are not cached yet are read for this call only, for
+    one-off reads such as building the cube
+
+    Returns:
+    pd.DataFrame: The haul dataset, typed as declared in data.schema
+    """
+    source = dataset_source(path)
+    version = file_version(source)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[:2] == (source, version):
+            all_columns, order, df = cached[2], cached[3], cached[4]
+        else:
+            all_columns, order, df = _source_columns(source), None, pd.DataFrame()
+
+        wanted = all_columns if columns is None else list(columns)
+        missing = [column for column in wanted if column not in df.columns]
+        if missing and 'date' not in df.columns and 'date' not in missing:
+            # The order of the rows is given by the dates
+            missing.append('date')
+        if missing:
+            loaded = _read_columns(source, missing)
+            if 'date' in loaded.columns:
+                order = date_order(loaded['date'])
+            if order is not None:
+                loaded = loaded.take(order).reset_index(drop=True)
+            # Assembled without copying, so columns of a column store stay memory-mapped
+            columns_by_name = {**dict(df.items()), **dict(loaded.items())}
+            df = pd.DataFrame({column: columns_by_name[column] for column in all_columns if column in columns_by_name}, copy=False)
+        if cache:
+            _cache[path] = (source, version, all_columns, order, df)
+
+    if columns is None:
+        return df
+    return pd.DataFrame({column: df[column] for column in columns}, copy=False)
+
+def load_date_range(start:Optional[pd.Timestamp]=None, end:Optional[pd.Timestamp]=None,
+                    columns:Optional[List[str]]=None, path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Loads the haul cycles with start <= date < end, for analyses of a period.
+
+    When the month-partitioned copy is up to date (see data.convert_dataset) only the months
+    in range are read, so the cost grows with the period and not with the whole history.
+    Otherwise the rows are sliced from load_dataset.
+
+    Args:
+    start: First date, unbounded if None
+    end: Date after the last one, unbounded if None
+    columns: Columns to load, all of them if None
+    path: Path of the CSV dataset
+
+    Returns:
+    pd.DataFrame: The haul cycles of the period, typed as declared in data.schema
+    """
+    store_path = partitions_path(path)
+    if _is_current(store_path, path):
+        if columns is None:
+            columns = partition_columns(store_path)
+        return apply_schema(read_partitions(store_path, list(columns), start, end))
+
+    df = slice_dates(load_dataset(path=path) if columns is None else load_dataset(list(dict.fromkeys(list(columns) + ['date'])), path), start, end)
+    return df if columns is None else df[list(columns)]
+
+def iter_dataset(chunk_size:int, columns:Optional[List[str]]=None,
+                 path:str=DATASET_PATH)->Iterator[pd.DataFrame]:
+    """
+    Reads the haul dataset in chunks of at most chunk_size rows, for datasets that don't fit
+    in memory. Chunks are not cached and each is typed on its own: the categories of truck
+    and loader are those present in the chunk.
+
+    Args:
+    chunk_size: Maximum rows per chunk
+    columns: Columns to read, all of them if None
+    path: Path of the CSV dataset
+
+    Returns:
+    Iterator[pd.DataFrame]: The chunks, in file order
+    """
+    source = dataset_source(path)
+    if columns is None:
+        columns = _source_columns(source)
+
+    if os.path.isdir(source):
+        # Mapped once, each chunk is a view of its rows that is paged in when read
+        df = read_column_store(source, columns)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+    elif source.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=columns):
+            yield apply_schema(batch.to_pandas())
+    else:
+        for chunk in pd.read_csv(source, usecols=columns, dtype=read_types(), chunksize=chunk_size):
+            yield apply_schema(chunk[columns])
+
+def dataset_version(path:str=DATASET_PATH)->Optional[List[int]]:
+    """
+    Version of the CSV dataset, the source of truth its copies and persisted aggregates are
+    derived from. None if there is no CSV.
+    """
+    if not os.path.exists(path):
+        return None
+    return list(file_version(path))
+
+def clear_dataset_cache()->None:
+    """
+    Drops every cached dataset, the next load_dataset call reads the file again.
+    """
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,357 @@
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from . import config
+
+# Call metrics of the transformations, figures, section layouts and Dash callbacks, kept in
+# memory per process and rendered in the Prometheus text format for the /metrics route. Each
+# call only updates a few counters, nothing runs between calls. The memory of the long-lived
+# objects (see track_memory) is measured when the metrics are rendered or logged
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the buckets of the duration histograms, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class _Stats:
+    __slots__ = ('calls', 'errors', 'seconds', 'rows', 'payload_bytes', 'peak_bytes', 'buckets')
+
+    def __init__(self):
+        self.calls, self.errors, self.seconds, self.rows, self.payload_bytes = 0, 0, 0.0, 0, 0
+        self.peak_bytes: Optional[int] = None
+        self.buckets = [0] * len(BUCKETS)
+
+# (kind, name) -> statistics of its calls
+_registry: Dict[Tuple[str, str], _Stats] = {}
+_lock = threading.Lock()
+# name -> function returning a long-lived object whose memory is reported
+_tracked: Dict[str, Callable[[], Any]] = {}
+# Whether the current thread is measuring the allocation peak of a call
+_tracing = threading.local()
+
+def record(kind:str, name:str, seconds:float, rows:Optional[int]=None, payload_bytes:Optional[int]=None,
+           error:bool=False, peak_bytes:Optional[int]=None)->None:
+    """
+    Adds a call to the metrics.
+
+    Args:
+    kind: transformation, figure, layout or callback
+    name: What was called
+    seconds: Wall time of the call
+    rows: Rows of its output, if known
+    payload_bytes: Size of its output, if known
+    error: Whether it raised
+    peak_bytes: Memory it allocated at its peak, if measured
+    """
+    with _lock:
+        stats = _registry.get((kind, name))
+        if stats is None:
+            stats = _registry[(kind, name)] = _Stats()
+        stats.calls += 1
+        stats.errors += error
+        stats.seconds += seconds
+        stats.rows += rows or 0
+        stats.payload_bytes += payload_bytes or 0
+        if peak_bytes is not None:
+            stats.peak_bytes = max(stats.peak_bytes or 0, peak_bytes)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stats.buckets[i] += 1
+                break
+
+def _figure_size(figure:Any)->Tuple[int, int]:
+    """
+    Points of a figure and approximate size of its JSON: the data arrays of its traces, which
+    make most of it, encoded in base64 as plotly does with typed arrays. Serializing the figure
+    to measure it exactly would cost as much as sending it.
+    """
+    points, size = 0, 0
+    for trace in figure.data:
+        trace_points = 0
+        for name in ('x', 'y', 'z', 'values', 'labels', 'text', 'customdata'):
+            value = getattr(trace, name, None)
+            if isinstance(value, np.ndarray):
+                size += 4 * -(-value.nbytes // 3)
+                trace_points = max(trace_points, value.size)
+            elif isinstance(value, (list, tuple)):
+                size += 8 * len(value)
+                trace_points = max(trace_points, len(value))
+        points += trace_points
+    return points, size
+
+def output_size(result:Any)->Tuple[Optional[int], Optional[int]]:
+    """
+    Rows and size in bytes of what a function returned: the rows and memory of frames, the
+    points and approximate JSON size of figures (also inside Dash components), the rows of
+    tables.
+
+    Returns:
+    Tuple[Optional[int], Optional[int]]: Rows and bytes, None when unknown
+    """
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=False).sum())
+    if hasattr(result, 'data') and hasattr(result, 'layout') and hasattr(result, 'to_plotly_json'):
+        return _figure_size(result)
+    if isinstance(getattr(result, 'data', None), list) and hasattr(result, 'to_plotly_json'):
+        # Tables
+        return len(result.data), None
+    if isinstance(result, (tuple, list)):
+        sizes = [output_size(part) for part in result]
+    elif hasattr(result, 'figure') or hasattr(result, 'children'):
+        figure = getattr(result, 'figure', None)
+        children = getattr(result, 'children', None)
+        parts = [figure] + (children if isinstance(children, list) else [children])
+        sizes = [output_size(part) for part in parts if part is not None and not isinstance(part, str)]
+    else:
+        return None, None
+    rows = [rows for rows, _ in sizes if rows is not None]
+    sizes = [size for _, size in sizes if size is not None]
+    return (sum(rows) if rows else None), (sum(sizes) if sizes else None)
+
+def metric_name(func:Callable)->str:
+    """
+    Name of a function in the metrics: module.function, or only the function when it has a
+    module of its own, as the transformations.
+    """
+    module = func.__module__.rsplit('.', 1)[-1]
+    return func.__name__ if module == func.__name__ else f'{module}.{func.__name__}'
+
+def _start_allocation_peak()->Optional[int]:
+    """
+    Starts measuring the peak of the memory allocated, starting tracemalloc the first time.
+
+    Returns:
+    Optional[int]: Memory traced at the start, None if the thread is already measuring a call
+    that encloses this one
+    """
+    if getattr(_tracing, 'active', False):
+        return None
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _tracing.active = True
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+def _stop_allocation_peak(start:Optional[int])->Optional[int]:
+    """
+    Memory allocated at the peak since _start_allocation_peak returned start. tracemalloc
+    traces the whole process, calls running at the same time in other threads add to it.
+    """
+    if start is None:
+        return None
+    _tracing.active = False
+    return max(tracemalloc.get_traced_memory()[1] - start, 0)
+
+def instrument(kind:str)->Callable[[Callable], Callable]:
+    """
+    Decorator that records the calls of a function in the metrics: count, errors, wall time,
+    and rows and size of its output (see output_size). The builds of the section layouts also
+    record the memory they allocate at their peak, and log it, when data.config.MEMORY_TRACING
+    is on. Does nothing when data.config.METRICS is off.
+
+    Args:
+    kind: transformation, figure or layout
+    """
+    def decorator(func:Callable)->Callable:
+        name = metric_name(func)
+        measure_memory = kind == 'layout'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not config.METRICS:
+                return func(*args, **kwargs)
+            memory_start = _start_allocation_peak() if measure_memory and config.MEMORY_TRACING else None
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                record(kind, name, time.perf_counter() - start, error=True,
+                       peak_bytes=_stop_allocation_peak(memory_start))
+                raise
+            seconds = time.perf_counter() - start
+            peak_bytes = _stop_allocation_peak(memory_start)
+            rows, payload_bytes = output_size(result)
+            record(kind, name, seconds, rows, payload_bytes, peak_bytes=peak_bytes)
+            if peak_bytes is not None:
+                logger.info('%s %s: %.1f MiB allocated at peak, %s resident', kind, name,
+                            peak_bytes / 2**20, _format_bytes(resident_memory()))
+            return result
+        return wrapper
+    return decorator
+
+def track_memory(name:str, getter:Callable[[], Any])->None:
+    """
+    Reports the memory of a long-lived object, such as a cache or a frame kept by a module, in
+    the metrics and in log_memory.
+
+    Args:
+    name: Name of the object in the metrics, as module.variable
+    getter: Returns the object, it is called on each report so that objects that are replaced
+    or grow are followed
+    """
+    _tracked[name] = getter
+
+def memory_size(obj:Any, seen:Optional[set]=None)->int:
+    """
+    Bytes held by an object, following frames, arrays and containers. A buffer is counted once
+    even if several arrays are views of it, as the summaries of the cube cells are.
+
+    Args:
+    obj: The object
+    seen: Ids of the objects already counted, to share between calls
+
+    Returns:
+    int: Its size in bytes
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        base = obj
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if base is not obj:
+            return sys.getsizeof(obj) + memory_size(base, seen)
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(memory_size(item, seen) for item in obj.ravel())
+        return size
+    if isinstance(obj, pd.DataFrame):
+        # Subclasses keep data out of the columns in their _metadata attributes, as data.cube.Cube
+        return (int(obj.index.memory_usage(deep=True)) + sum(_column_size(column, seen) for _, column in obj.items())
+                + sum(memory_size(getattr(obj, name, None), seen) for name in obj._metadata))
+    if isinstance(obj, pd.Series):
+        return int(obj.index.memory_usage(deep=True)) + _column_size(obj, seen)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        # A copy of the items, the dict may change while it is measured
+        size += sum(memory_size(key, seen) + memory_size(value, seen) for key, value in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(memory_size(item, seen) for item in list(obj))
+    return size
+
+def _column_size(column:pd.Series, seen:set)->int:
+    if column.dtype == object:
+        return memory_size(column.to_numpy(), seen)
+    return int(column.memory_usage(index=False, deep=True))
+
+def memory_footprints()->Dict[str, int]:
+    """
+    Bytes held by each object registered with track_memory.
+    """
+    return {name: memory_size(_tracked[name]()) for name in sorted(_tracked)}
+
+def resident_memory()->Optional[int]:
+    """
+    Resident memory of this process in bytes, None where the platform doesn't report it.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_resident_memory()->Optional[int]:
+    """
+    Peak resident memory of this process in bytes, None where the platform doesn't report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _format_bytes(size:Optional[int])->str:
+    return 'unknown' if size is None else f'{size / 2**20:.1f} MiB'
+
+def log_memory()->None:
+    """
+    Logs the memory of the process and of each object registered with track_memory.
+    """
+    for name, size in memory_footprints().items():
+        logger.info('%s: %s', name, _format_bytes(size))
+    logger.info('process: %s resident, %s at peak', _format_bytes(resident_memory()),
+                _format_bytes(peak_resident_memory()))
+
+def _labels(**labels:Any)->str:
+    escaped = (f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+def render_metrics()->str:
+    """
+    The metrics in the Prometheus text exposition format.
+    """
+    with _lock:
+        snapshot = []
+        for key in sorted(_registry):
+            stats = _registry[key]
+            copy = _Stats()
+            copy.calls, copy.errors, copy.seconds = stats.calls, stats.errors, stats.seconds
+            copy.rows, copy.payload_bytes, copy.buckets = stats.rows, stats.payload_bytes, list(stats.buckets)
+            copy.peak_bytes = stats.peak_bytes
+            snapshot.append((key, copy))
+
+    lines: List[str] = []
+    def family(metric:str, kind:str, description:str, values:Callable[[_Stats], float])->None:
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for (call_kind, name), stats in snapshot:
+            lines.append(f'{metric}{_labels(kind=call_kind, name=name)} {values(stats)}')
+
+    family('haul_calls_total', 'counter', 'Calls', lambda stats: stats.calls)
+    family('haul_call_errors_total', 'counter', 'Calls that raised', lambda stats: stats.errors)
+    family('haul_output_rows_total', 'counter', 'Rows of the frames and points of the figures returned',
+           lambda stats: stats.rows)
+    family('haul_output_bytes_total', 'counter',
+           'Size of the frames, figures (approximate) and callback responses returned', lambda stats: stats.payload_bytes)
+
+    metric = 'haul_call_duration_seconds'
+    lines.append(f'# HELP {metric} Wall time of the calls')
+    lines.append(f'# TYPE {metric} histogram')
+    for (call_kind, name), stats in snapshot:
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(f'{metric}_bucket{_labels(kind=call_kind, name=name, le=bound)} {cumulative}')
+        lines.append(f'{metric}_bucket{_labels(kind=call_kind, name=name, le="+Inf")} {stats.calls}')
+        lines.append(f'{metric}_sum{_labels(kind=call_kind, name=name)} {stats.seconds}')
+        lines.append(f'{metric}_count{_labels(kind=call_kind, name=name)} {stats.calls}')
+
+    metric = 'haul_call_peak_bytes'
+    lines.append(f'# HELP {metric} Most memory allocated at the peak of a call, with data.config.MEMORY_TRACING on')
+    lines.append(f'# TYPE {metric} gauge')
+    for (call_kind, name), stats in snapshot:
+        if stats.peak_bytes is not None:
+            lines.append(f'{metric}{_labels(kind=call_kind, name=name)} {stats.peak_bytes}')
+
+    metric = 'haul_object_bytes'
+    lines.append(f'# HELP {metric} Memory held by long-lived objects, such as caches')
+    lines.append(f'# TYPE {metric} gauge')
+    for name, size in memory_footprints().items():
+        lines.append(f'{metric}{_labels(name=name)} {size}')
+
+    for metric, description, size in (('process_resident_memory_bytes', 'Resident memory', resident_memory()),
+                                      ('haul_peak_resident_memory_bytes', 'Peak resident memory', peak_resident_memory())):
+        if size is not None:
+            lines.append(f'# HELP {metric} {description} of the process')
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {size}')
+    return '\n'.join(lines) + '\n'
+
+def reset_metrics()->None:
+    """
+    Drops every recorded call.
+    """
+    with _lock:
+        _registry.clear()
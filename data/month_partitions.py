@@ -0,0 +1,96 @@
+import json
+import os
+from typing import List, Optional
+import pandas as pd
+from .date_index import slice_dates
+from .schema import apply_schema
+
+METADATA_FILE = 'metadata.json'
+
+def partitions_path(path:str)->str:
+    """
+    Directory of the month-partitioned copy of a CSV dataset, written by data.convert_dataset.
+    """
+    return os.path.splitext(path)[0] + '.months'
+
+def _month_file(store_path:str, month:str)->str:
+    return os.path.join(store_path, f'{month}.parquet')
+
+def write_partitions(df:pd.DataFrame, store_path:str)->None:
+    """
+    Writes a frame as one Parquet file per month of its date column, YYYY-MM.parquet, plus a
+    metadata file listing the months and the columns. Rows are stored sorted by date. The metadata is written
+    last, so readers never see a half-written copy.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    df = df.sort_values('date', kind='stable', ignore_index=True)
+    months = df['date'].dt.strftime('%Y-%m')
+    for month, rows in df.groupby(months, sort=True):
+        rows.to_parquet(_month_file(store_path, month), index=False)
+    _write_metadata(store_path, sorted(months.unique()), list(df.columns))
+
+def _read_metadata(store_path:str)->dict:
+    with open(os.path.join(store_path, METADATA_FILE)) as file:
+        return json.load(file)
+
+def _read_months(store_path:str)->List[str]:
+    return _read_metadata(store_path)['months']
+
+def partition_columns(store_path:str)->List[str]:
+    """
+    Names of the columns in a month-partitioned copy.
+    """
+    metadata = _read_metadata(store_path)
+    if 'columns' in metadata:
+        return metadata['columns']
+    # Copies written before the columns were listed, every month has them all
+    import pyarrow.parquet as pq
+    return pq.read_schema(_month_file(store_path, metadata['months'][0])).names
+
+def _write_metadata(store_path:str, months:List[str], columns:List[str])->None:
+    temporary_path = os.path.join(store_path, METADATA_FILE + '.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump({'months': months, 'columns': columns}, file)
+    os.replace(temporary_path, os.path.join(store_path, METADATA_FILE))
+
+def append_partitions(df:pd.DataFrame, store_path:str)->None:
+    """
+    Appends rows to a month-partitioned copy, only the files of their months are rewritten.
+    """
+    months, columns = _read_months(store_path), partition_columns(store_path)
+    batch_months = df['date'].dt.strftime('%Y-%m')
+    for month, rows in df.groupby(batch_months, sort=True):
+        month_path = _month_file(store_path, month)
+        if month in months:
+            stored = pd.read_parquet(month_path)
+            rows = apply_schema(pd.concat([stored, rows[columns]], ignore_index=True))
+        else:
+            rows = rows[columns]
+        rows = rows.sort_values('date', kind='stable', ignore_index=True)
+        rows.to_parquet(month_path + '.tmp', index=False)
+        os.replace(month_path + '.tmp', month_path)
+    _write_metadata(store_path, sorted(set(months) | set(batch_months.unique())), columns)
+
+def read_partitions(store_path:str, columns:List[str], start:Optional[pd.Timestamp]=None,
+                    end:Optional[pd.Timestamp]=None)->pd.DataFrame:
+    """
+    Reads the rows with start <= date < end, opening only the files of the months in range.
+
+    Returns:
+    pd.DataFrame: The rows in range, untyped (see data.schema.apply_schema)
+    """
+    months = _read_months(store_path)
+    if start is not None:
+        months = [month for month in months if month >= start.strftime('%Y-%m')]
+    if end is not None:
+        months = [month for month in months if month <= (end - pd.Timedelta(1)).strftime('%Y-%m')]
+
+    read_columns = columns if 'date' in columns else columns + ['date']
+    parts = [pd.read_parquet(_month_file(store_path, month), columns=read_columns) for month in months]
+    if not parts:
+        return pd.DataFrame({column: [] for column in columns})
+    df = pd.concat(parts, ignore_index=True)
+
+    # Months are read in order and sorted within, only the first and last have rows out of range
+    df = slice_dates(df, start, end).reset_index(drop=True)
+    return df[columns]
@@ -0,0 +1,139 @@
+from typing import List, Optional, Tuple
+import pandas as pd
+from .load_dataset import DATASET_PATH, current_parquet
+from .schema import METRIC_COLUMNS, apply_schema
+
+# Polars backend of the transformations (see data.backends): lazy queries over the Parquet copy
+# of the dataset or the CSV, run on all cores by the streaming engine, so the dataset is never
+# loaded whole
+
+QUARTILES = (('Q1', 0.25), ('median', 0.5), ('Q3', 0.75))
+
+def _scan(path:str):
+    """
+    Lazy frame of the dataset, with the types of data.schema.
+    """
+    import polars as pl
+    parquet_path = current_parquet(path)
+    if parquet_path is not None:
+        return pl.scan_parquet(parquet_path)
+    schema = {column: pl.Float32 for column in METRIC_COLUMNS}
+    schema['date'] = pl.Date
+    return pl.scan_csv(path, schema_overrides=schema)
+
+def _collect(query)->pd.DataFrame:
+    return apply_schema(query.collect(engine='streaming').to_pandas())
+
+def daily_totals(path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Cycles and tons of each day.
+
+    Returns:
+    pd.DataFrame: date, daily_cycles and daily_tons, as in aggregate_daily_and_monthly
+    """
+    import polars as pl
+    return _collect(_scan(path).group_by('date').agg(
+        pl.len().cast(pl.Int64).alias('daily_cycles'),
+        pl.col('ton').cast(pl.Float64).sum().alias('daily_tons'),
+    ).sort('date'))
+
+def daily_active_trucks(path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Trucks with cycles each day.
+
+    Returns:
+    pd.DataFrame: date and daily_active_trucks, as in aggregate_daily_active_trucks
+    """
+    import polars as pl
+    return _collect(_scan(path).group_by('date').agg(
+        pl.col('truck').n_unique().cast(pl.Int64).alias('daily_active_trucks'),
+    ).sort('date'))
+
+def daily_truck_cycles(path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Cycles of each truck each day it was active.
+
+    Returns:
+    pd.DataFrame: date, truck and daily_cycles, sorted by date and truck
+    """
+    import polars as pl
+    return _collect(_scan(path).group_by(['date', 'truck']).agg(
+        pl.len().cast(pl.Int64).alias('daily_cycles'),
+    ).sort(['date', 'truck']))
+
+def rollup(by:List[str], metric:str, include_zeros:bool=True, quantiles:bool=False,
+           start:Optional[pd.Timestamp]=None, path:str=DATASET_PATH)->pd.DataFrame:
+    """
+    Statistics of a metric over the cycles of each group, the Polars version of
+    data.cube.rollup on the cube of the whole dataset, or of its days since start. Quantiles
+    are exact.
+
+    Returns:
+    pd.DataFrame: As returned by data.cube.rollup
+    """
+    import polars as pl
+    values = pl.col(metric).cast(pl.Float64)
+    if not include_zeros:
+        values = pl.when(values != 0).then(values)
+    aggregations = [
+        values.count().cast(pl.Int64).alias('count'),
+        values.sum().alias('sum'),
+        values.min().alias('min'),
+        values.max().alias('max'),
+        values.mean().alias('mean'),
+        values.std().alias('std'),
+    ]
+    if quantiles:
+        aggregations += [values.quantile(quantile, interpolation='linear').alias(name) for name, quantile in QUARTILES]
+    dataset = _scan(path)
+    if start is not None:
+        dataset = dataset.filter(pl.col('date') >= pl.lit(pd.Timestamp(start).date()))
+    return _collect(dataset.group_by(by).agg(aggregations).sort(by))
+
+def truck_comparison(truck:str, path:str=DATASET_PATH)->Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Daily cycles of a truck and statistics of the daily cycles of the other active trucks.
+
+    Returns:
+    Tuple[pd.DataFrame, pd.DataFrame]: As returned by CAEX61_comparison
+    """
+    import polars as pl
+    daily = _scan(path).group_by(['truck', 'date']).agg(pl.len().cast(pl.Int64).alias('daily_cycles'))
+    truck_daily = daily.filter(pl.col('truck') == truck).select(['date', 'daily_cycles']).sort('date')
+    cycles = pl.col('daily_cycles')
+    other_trucks = daily.filter(pl.col('truck') != truck).group_by('date').agg(
+        cycles.mean().alias('mean'),
+        cycles.quantile(0.5, interpolation='linear').alias('median'),
+        cycles.quantile(0.25, interpolation='linear').alias('Q1'),
+        cycles.quantile(0.75, interpolation='linear').alias('Q3'),
+        cycles.min().alias('min'),
+    ).sort('date')
+    # Both from one plan, the dataset is scanned once
+    truck_daily, other_trucks = pl.collect_all([truck_daily, other_trucks], engine='streaming')
+    return apply_schema(truck_daily.to_pandas()), apply_schema(other_trucks.to_pandas())
+
+def monthly_statistics(daily:pd.DataFrame, column:str)->pd.DataFrame:
+    """
+    Statistics of a daily total per month.
+
+    Args:
+    daily: date and the column, as returned by aggregate_daily_cycles or aggregate_daily_tons
+
+    Returns:
+    pd.DataFrame: As returned by aggregate_monthly_cycles
+    """
+    import polars as pl
+    values = pl.col(column)
+    monthly = pl.from_pandas(daily[['date', column]]).lazy().group_by(
+        pl.col('date').dt.strftime('%Y-%m').alias('month')
+    ).agg(
+        values.sum().alias('sum'),
+        values.mean().alias('mean'),
+        values.quantile(0.5, interpolation='linear').alias('median'),
+        values.std().alias('std'),
+        values.min().alias('min'),
+        values.max().alias('max'),
+        values.quantile(0.25, interpolation='linear').alias('Q1'),
+        values.quantile(0.75, interpolation='linear').alias('Q3'),
+    ).sort('month')
+    return monthly.collect().to_pandas()
@@ -0,0 +1,290 @@
+import operator
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .backends import active_backend
+from .cube import CUBE_KEYS, Cube, load_cube, rollup
+from .date_index import slice_dates
+from .load_dataset import DATASET_PATH, _source_columns, dataset_source, load_dataset, load_date_range
+from .schema import METRIC_COLUMNS
+from .statistics import QUANTILES, STATISTICS, grouped_statistics
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda series, values: series.isin(values),
+}
+
+# Statistic of agg counting the rows of each group, whatever the column
+SIZE = 'size'
+
+# Keys of group_by computed from the date when the rows don't have them
+DERIVED_KEYS: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    'month': lambda dates: dates.dt.strftime('%Y-%m'),
+}
+
+@dataclass(frozen=True)
+class Query:
+    """
+    Lazy query over the haul dataset or a frame, built with scan. Every step returns a new
+    query and nothing is read until collect, which plans the whole query at once:
+
+    - only the columns used by the query are loaded (projection pushdown)
+    - date >= and date < predicates select the period before loading, from the month
+    partitions or a slice of the sorted dataset (predicate pushdown, see load_date_range)
+    - the other predicates are combined into one mask, computed on their columns only and
+    applied to the loaded columns once
+    - grouped queries (group_by and agg) run below the rows when they can: on the configured
+    backend (see data.backends) or on the cells of the cube (see data.cube), with the period
+    sliced from the cube. Otherwise the statistics are computed in one pass per aggregated
+    column over the projected and filtered rows (see grouped_statistics)
+    """
+    path: str = DATASET_PATH
+    df: Optional[pd.DataFrame] = field(default=None, compare=False, repr=False)
+    columns: Optional[Tuple[str, ...]] = None
+    predicates: Tuple[Tuple[str, str, Any], ...] = ()
+    keys: Tuple[str, ...] = ()
+    aggregations: Tuple[Tuple[str, str, str], ...] = ()
+
+    def select(self, *columns:str)->'Query':
+        """
+        Keeps only these columns, in this order.
+        """
+        return replace(self, columns=columns)
+
+    def filter(self, column:str, op:str, value:Any)->'Query':
+        """
+        Keeps the rows where `column op value` holds, op is any of OPERATORS. Rows are
+        filtered before they are grouped.
+        """
+        if op not in OPERATORS:
+            raise ValueError(f'Unknown operator {op}, expected one of {list(OPERATORS)}')
+        return replace(self, predicates=self.predicates + ((column, op, value),))
+
+    def group_by(self, *keys:str)->'Query':
+        """
+        Groups the rows by these columns or DERIVED_KEYS, aggregated with agg.
+        """
+        return replace(self, keys=keys)
+
+    def agg(self, **aggregations:Tuple[str, str])->'Query':
+        """
+        Aggregates each group, as name=(column, statistic) with any of
+        data.statistics.STATISTICS or SIZE.
+        """
+        for name, (column, statistic) in aggregations.items():
+            if statistic not in STATISTICS and statistic != SIZE:
+                raise ValueError(f'Unknown statistic {statistic}, expected one of {STATISTICS + [SIZE]}')
+        return replace(self, aggregations=self.aggregations + tuple(
+            (name, column, statistic) for name, (column, statistic) in aggregations.items()))
+
+    def _period(self)->Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp], List[Tuple[str, str, Any]]]:
+        """
+        Splits the predicates into the [start, end) period they select and the rest.
+        """
+        start, end, residual = None, None, []
+        for column, op, value in self.predicates:
+            if column == 'date' and op == '>=':
+                start = pd.Timestamp(value) if start is None else max(start, pd.Timestamp(value))
+            elif column == 'date' and op == '<':
+                end = pd.Timestamp(value) if end is None else min(end, pd.Timestamp(value))
+            else:
+                residual.append((column, op, value))
+        return start, end, residual
+
+    def collect(self)->pd.DataFrame:
+        """
+        Runs the query.
+
+        Returns:
+        pd.DataFrame: The selected columns of the rows that pass the filters or, if grouped,
+        the keys and the aggregations of each group, sorted by the keys
+        """
+        if self.aggregations and not self.keys:
+            raise ValueError('agg needs group_by keys')
+        if not self.aggregations:
+            if self.columns is not None:
+                output = list(self.columns)
+            elif self.df is not None:
+                output = list(self.df.columns)
+            else:
+                output = _source_columns(dataset_source(self.path))
+            return self._rows(output)
+
+        plan = self._cube_plan()
+        if plan is not None and self.df is None and active_backend() is not None:
+            if self._fits_backend(*plan):
+                return self._aggregate_backend(*plan)
+        elif plan is not None and (self.df is None or isinstance(self.df, Cube)):
+            return self._aggregate_cells(*plan)
+        return self._aggregate_rows()
+
+    def _rows(self, output:List[str])->pd.DataFrame:
+        """
+        The output columns of the rows that pass the filters.
+        """
+        start, end, residual = self._period()
+        needed = list(dict.fromkeys(output + [column for column, _, _ in residual]))
+        if self.df is not None:
+            df = self.df
+            residual = list(self.predicates)
+        elif start is None and end is None:
+            df = load_dataset(needed, self.path)
+        else:
+            df = load_date_range(start, end, needed, self.path)
+
+        rows = pd.DataFrame({column: df[column] for column in output}, copy=False)
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, value in residual:
+            mask &= OPERATORS[op](df[column], value).to_numpy()
+        if not mask.all():
+            rows = rows[mask]
+
+        return rows
+
+    def _cube_plan(self)->Optional[Tuple[Optional[str], bool]]:
+        """
+        Whether the grouped query can run on the cells of a cube: grouped by cell keys, over
+        one metric or the cycles, with rows filtered by their cell keys or, for a metric, by
+        metric != 0.
+
+        Returns:
+        Optional[Tuple[Optional[str], bool]]: The aggregated metric, None if only SIZE, and
+        whether its zeros are included. None if the query needs the rows
+        """
+        if not set(self.keys) <= set(CUBE_KEYS) | set(DERIVED_KEYS):
+            return None
+        metrics = {column for _, column, statistic in self.aggregations if statistic != SIZE}
+        if len(metrics) > 1 or not metrics <= set(METRIC_COLUMNS):
+            return None
+        metric = next(iter(metrics), None)
+        sized = any(statistic == SIZE for _, _, statistic in self.aggregations)
+
+        include_zeros = True
+        for column, op, value in self.predicates:
+            if column in CUBE_KEYS:
+                continue
+            if column == metric and op == '!=' and value == 0 and not sized:
+                include_zeros = False
+                continue
+            return None
+        return metric, include_zeros
+
+    def _fits_backend(self, metric:Optional[str], include_zeros:bool)->bool:
+        """
+        Whether the backend's rollup computes the cube plan: a metric of the days since a
+        start, grouped by cell keys.
+        """
+        start, end, residual = self._period()
+        return (metric is not None and end is None and set(self.keys) <= set(CUBE_KEYS)
+                and all(statistic != SIZE for _, _, statistic in self.aggregations)
+                and all(column == metric for column, _, _ in residual))
+
+    def _quantiles(self)->bool:
+        """
+        Whether the cells' sketches are needed, for the quartiles.
+        """
+        return any(statistic in QUANTILES and statistic not in ('min', 'max')
+                   for _, _, statistic in self.aggregations)
+
+    def _aggregate_backend(self, metric:str, include_zeros:bool)->pd.DataFrame:
+        """
+        Runs the grouped query with the backend's rollup.
+        """
+        start, _, _ = self._period()
+        backend = active_backend()
+        stats = backend.rollup(list(self.keys), metric, include_zeros, self._quantiles(), start, self.path)
+        return self._named(stats, stats)
+
+    def _aggregate_cells(self, metric:Optional[str], include_zeros:bool)->pd.DataFrame:
+        """
+        Runs the grouped query on the cells of the cube, rolled up with data.cube.rollup.
+        """
+        start, end, residual = self._period()
+        cube = load_cube(self.path) if self.df is None else self.df
+        cells = slice_dates(cube, start, end)
+        mask = np.ones(len(cells), dtype=bool)
+        for column, op, value in residual:
+            if column in CUBE_KEYS:
+                mask &= OPERATORS[op](cells[column], value).to_numpy()
+        if not mask.all():
+            cells = cells[mask]
+        keys = list(self.keys)
+        derived = {key: DERIVED_KEYS[key](cells['date']) for key in keys if key in DERIVED_KEYS}
+        if derived:
+            cells = cells.assign(**derived)
+
+        stats = None
+        if metric is not None:
+            stats = rollup(cells, keys, metric, include_zeros, self._quantiles())
+        sizes = None
+        if any(statistic == SIZE for _, _, statistic in self.aggregations):
+            sizes = cells.groupby(keys, observed=True, sort=True)['cycles'].sum().reset_index(name=SIZE)
+        if stats is None:
+            stats = sizes
+        elif sizes is not None:
+            stats[SIZE] = sizes[SIZE].to_numpy()
+        return self._named(stats, stats)
+
+    def _aggregate_rows(self)->pd.DataFrame:
+        """
+        Runs the grouped query over the rows, one grouped_statistics pass per aggregated
+        column.
+        """
+        keys = list(self.keys)
+        columns = self.df.columns if self.df is not None else _source_columns(dataset_source(self.path))
+        derived = [key for key in keys if key in DERIVED_KEYS and key not in columns]
+        output = [key for key in keys if key not in derived] + ['date'] * bool(derived)
+        output += [column for _, column, _ in self.aggregations]
+        rows = self._rows(list(dict.fromkeys(output)))
+        if derived:
+            rows = rows.assign(**{key: DERIVED_KEYS[key](rows['date']) for key in derived})
+
+        by_column: Dict[str, List[str]] = {}
+        for _, column, statistic in self.aggregations:
+            if statistic != SIZE:
+                by_column.setdefault(column, []).append(statistic)
+
+        result = rows.groupby(keys, observed=True, sort=True).size().reset_index(name=SIZE)
+        computed = {}
+        for column, statistics in by_column.items():
+            stats = grouped_statistics(rows, keys, column, list(dict.fromkeys(statistics)))
+            computed.update({(column, statistic): stats[statistic] for statistic in statistics})
+        return self._named(result, computed)
+
+    def _named(self, keys:pd.DataFrame, stats:Any)->pd.DataFrame:
+        """
+        The keys and the aggregations, named as in agg, from the statistics of every column
+        (a frame of one metric's statistics or a dict by (column, statistic)).
+        """
+        result = keys[list(self.keys)].copy()
+        for name, column, statistic in self.aggregations:
+            if isinstance(stats, dict) and statistic != SIZE:
+                values = stats[(column, statistic)]
+            else:
+                values = (keys if statistic == SIZE else stats)[statistic]
+            result[name] = values.to_numpy()
+        return result
+
+def scan(path:str=DATASET_PATH, df:pd.DataFrame=None)->Query:
+    """
+    Starts a lazy query over the haul dataset (see Query), for example:
+
+    scan().select('loader', 'ton').filter('ton', '!=', 0).collect()
+    scan().group_by('loader').agg(cycles=('ton', 'size'), median_ton=('ton', 'median')).collect()
+
+    Args:
+    path: Path of the CSV dataset
+    df: Frame to query instead of the dataset: rows of haul cycles, a cube (see
+    data.cube.Cube), whose cells grouped queries roll up, or any other frame, such as the
+    daily totals
+
+    Returns:
+    Query: A query over every column and row
+    """
+    return Query(path, df)
@@ -0,0 +1,50 @@
+from typing import Dict
+import pandas as pd
+
+# Declared types of the haul dataset columns, applied whenever the dataset is read
+CATEGORICAL_COLUMNS = ['truck', 'loader']
+METRIC_COLUMNS = [
+    'ton',
+    'n_shovel',
+    'loader_total_cycle',
+    'truck_total_cycle',
+    'distance_empty',
+    'distance_full',
+]
+METRIC_TYPE = 'float32'
+DATE_TYPE = 'datetime64[ns]'
+
+def read_types()->Dict[str, str]:
+    """
+    dtype argument for pd.read_csv, the date column is parsed separately.
+    """
+    types = {column: 'category' for column in CATEGORICAL_COLUMNS}
+    types.update({column: METRIC_TYPE for column in METRIC_COLUMNS})
+    return types
+
+def apply_schema(df:pd.DataFrame)->pd.DataFrame:
+    """
+    Casts the columns of a freshly read frame to the declared schema, in place.
+
+    - truck, loader: categorical, with the sorted list of codes as categories so the category
+    order doesn't depend on the file's row order
+    - metrics: float32, measurements in the dataset have far fewer significant digits than
+    float32 keeps
+    - date: datetime64, parsed once here
+
+    Returns:
+    pd.DataFrame: The same frame, for chaining
+    """
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                categories = sorted(df[column].cat.categories)
+            else:
+                categories = sorted(df[column].dropna().unique())
+            df[column] = df[column].astype(pd.CategoricalDtype(categories))
+    for column in METRIC_COLUMNS:
+        if column in df.columns and df[column].dtype != METRIC_TYPE:
+            df[column] = df[column].astype(METRIC_TYPE)
+    if 'date' in df.columns and df['date'].dtype != DATE_TYPE:
+        df['date'] = pd.to_datetime(df['date']).astype(DATE_TYPE)
+    return df
@@ -0,0 +1,52 @@
+from typing import Tuple
+import numpy as np
+
+def compress(values:np.ndarray, weights:np.ndarray, group_ids:np.ndarray, n_groups:int,
+             compression:int)->Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compresses the weighted values of many groups into quantile sketches at once.
+
+    A sketch is a sorted list of centroids (mean value, weight). Groups with up to compression
+    centroids are kept as they are, so small groups stay exact. Larger groups are merged into
+    at most compression / 2 + 1 centroids along the t-digest k1 scale: centroids are small
+    near the tails and wide around the median, which keeps the extreme quantiles accurate.
+    Sketches are merged by concatenating their centroids and compressing again.
+
+    Args:
+    values: Values or centroid means, NaN are dropped
+    weights: Weight of each value, 1 for raw values
+    group_ids: Group of each value, in [0, n_groups)
+    n_groups: Number of groups
+    compression: Maximum centroids per group, higher is more accurate
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray, np.ndarray]: values, weights and group_ids of the centroids,
+    sorted by group and value
+    """
+    valid = ~np.isnan(values)
+    values, weights, group_ids = values[valid], weights[valid], group_ids[valid]
+    order = np.lexsort((values, group_ids))
+    values, weights, group_ids = values[order], weights[order], group_ids[order]
+
+    sizes = np.bincount(group_ids, minlength=n_groups)
+    large = sizes > compression
+    if not large.any():
+        return values, weights, group_ids
+
+    starts = np.cumsum(sizes) - sizes
+    position = np.arange(len(values)) - starts[group_ids]
+
+    totals = np.bincount(group_ids, weights=weights, minlength=n_groups)
+    weight_before_group = np.cumsum(totals) - totals
+    quantile = (np.cumsum(weights) - weights / 2 - weight_before_group[group_ids]) / totals[group_ids]
+    scale = compression / (2 * np.pi) * np.arcsin(np.clip(2 * quantile - 1, -1, 1))
+    bucket = np.where(large[group_ids], np.floor(scale + compression / 4), position)
+
+    new_centroid = np.ones(len(values), dtype=bool)
+    new_centroid[1:] = (group_ids[1:] != group_ids[:-1]) | (bucket[1:] != bucket[:-1])
+    centroid_ids = np.cumsum(new_centroid) - 1
+    n_centroids = centroid_ids[-1] + 1 if len(values) else 0
+
+    centroid_weights = np.bincount(centroid_ids, weights=weights, minlength=n_centroids)
+    centroid_values = np.bincount(centroid_ids, weights=values * weights, minlength=n_centroids) / centroid_weights
+    return centroid_values, centroid_weights, group_ids[new_centroid]
@@ -0,0 +1,138 @@
+from typing import List, Sequence
+import numpy as np
+import pandas as pd
+
+STATISTICS = ['count', 'sum', 'mean', 'std', 'min', 'Q1', 'median', 'Q3', 'max']
+QUANTILES = {'min': 0, 'Q1': 0.25, 'median': 0.5, 'Q3': 0.75, 'max': 1}
+
+def grouped_quantiles(values:np.ndarray, group_ids:np.ndarray, n_groups:int,
+                      quantiles:Sequence[float], weights:np.ndarray=None)->np.ndarray:
+    """
+    Quantiles of the values of every group, with linear interpolation as pd.Series.quantile.
+
+    All the groups are sorted at once (by group and then value), each quantile is then read
+    at its offset inside the group's slice of the sorted values, without a Python call per
+    group.
+
+    Args:
+    values: Values, NaN are ignored
+    group_ids: Group of each value, in [0, n_groups)
+    n_groups: Number of groups
+    quantiles: Quantiles to compute, in [0, 1]
+    weights: Weight of each value, for sketch centroids (see data.sketch). Unit weights give
+    the exact quantiles
+
+    Returns:
+    np.ndarray: Array of shape (len(quantiles), n_groups), NaN for groups without values
+    """
+    values = np.asarray(values, dtype='float64')
+    valid = ~np.isnan(values)
+    values, group_ids = values[valid], group_ids[valid]
+    order = np.lexsort((values, group_ids))
+    values = values[order]
+    if weights is not None:
+        return _weighted_quantiles(values, weights[valid][order], group_ids[order], n_groups, quantiles)
+
+    counts = np.bincount(group_ids, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    empty = counts == 0
+    last = np.maximum(counts - 1, 0)
+
+    result = np.empty((len(quantiles), n_groups))
+    if len(values) == 0:
+        result[:] = np.nan
+        return result
+    for i, quantile in enumerate(quantiles):
+        position = last * quantile
+        below = np.floor(position).astype('int64')
+        above = np.minimum(below + 1, last)
+        fraction = position - below
+        low = values[np.minimum(starts + below, len(values) - 1)]
+        high = values[np.minimum(starts + above, len(values) - 1)]
+        result[i] = np.where(empty, np.nan, low + (high - low) * fraction)
+
+    return result
+
+def _weighted_quantiles(values:np.ndarray, weights:np.ndarray, group_ids:np.ndarray, n_groups:int,
+                        quantiles:Sequence[float])->np.ndarray:
+    """
+    grouped_quantiles for values sorted by group and value. A centroid of weight w stands for
+    w values, it is placed at the rank of its middle value and quantiles are interpolated
+    linearly between centroids.
+    """
+    counts = np.bincount(group_ids, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    ends = np.maximum(starts + counts - 1, 0)
+    empty = counts == 0
+
+    totals = np.bincount(group_ids, weights=weights, minlength=n_groups)
+    weight_before_group = np.cumsum(totals) - totals
+    centers = np.cumsum(weights) - weights / 2 - 0.5
+
+    result = np.empty((len(quantiles), n_groups))
+    if len(values) == 0:
+        result[:] = np.nan
+        return result
+    for i, quantile in enumerate(quantiles):
+        target = weight_before_group + quantile * np.maximum(totals - 1, 0)
+        below = np.clip(np.searchsorted(centers, target, side='right') - 1, starts, ends)
+        above = np.minimum(below + 1, ends)
+        span = centers[above] - centers[below]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(span > 0, (target - centers[below]) / span, 0)
+        fraction = np.clip(fraction, 0, 1)
+        low, high = values[below], values[above]
+        result[i] = np.where(empty, np.nan, low + (high - low) * fraction)
+
+    return result
+
+def grouped_statistics(df:pd.DataFrame, by:List[str], column:str,
+                       statistics:List[str]=None)->pd.DataFrame:
+    """
+    Computes summary statistics of a column for every group in one vectorized pass, the
+    replacement for groupby().agg() with per group quantile lambdas.
+
+    Args:
+    df: Data to summarize
+    by: Columns to group by, unobserved categories are not included
+    column: Column to summarize
+    statistics: Statistics to compute, any of STATISTICS in the requested order. All if None
+
+    Returns:
+    pd.DataFrame: A DataFrame with the by columns and one column per statistic:
+    - count, int: number of non-NaN values
+    - sum, mean, std (ddof=1): as pandas computes them
+    - min, Q1, median, Q3, max: quantiles, interpolated linearly
+    min, max and sum keep the type of integer columns
+    """
+    if statistics is None:
+        statistics = STATISTICS
+
+    grouped = df.groupby(by, observed=True, sort=True)
+    keys = grouped.size().index
+    group_ids = grouped.ngroup().to_numpy()
+    n_groups = len(keys)
+    values = df[column].to_numpy(dtype='float64')
+    valid = ~np.isnan(values)
+
+    count = np.bincount(group_ids[valid], minlength=n_groups)
+    total = np.bincount(group_ids[valid], weights=values[valid], minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        deviations = values[valid] - mean[group_ids[valid]]
+        variance = np.bincount(group_ids[valid], weights=deviations ** 2, minlength=n_groups) / (count - 1)
+    computed = {'count': count, 'sum': total, 'mean': mean, 'std': np.sqrt(variance)}
+
+    requested_quantiles = [statistic for statistic in statistics if statistic in QUANTILES]
+    if requested_quantiles:
+        quantiles = grouped_quantiles(values, group_ids, n_groups,
+                                      [QUANTILES[statistic] for statistic in requested_quantiles])
+        computed.update(zip(requested_quantiles, quantiles))
+
+    if df[column].dtype.kind in 'iu':
+        for statistic in ('sum', 'min', 'max'):
+            if statistic in computed:
+                computed[statistic] = computed[statistic].astype(df[column].dtype)
+
+    result = pd.DataFrame({statistic: computed[statistic] for statistic in statistics}, index=keys)
+    return result.reset_index()
@@ -1,23 +1,48 @@
-from typing import Tuple
+from typing import Optional, Tuple
 import pandas as pd
+from ..backends import active_backend
+from ..cube import load_cube
+from ..metrics import instrument
+from .fleet_comparison import fleet_comparison
 
+@instrument('transformation')
 def CAEX61_comparison()->Tuple[pd.DataFrame, pd.DataFrame]:
-    df = pd.read_csv('files/timeseries_haul_loading_data.csv')
-
-    trucks_daily_cycles = df[['truck', 'date']].sort_values(by='truck')
-    all_trucks = trucks_daily_cycles.groupby(['truck', 'date'], observed=True).size().reset_index(name='daily_cycles')
-    
-    CAEX_61 = all_trucks[all_trucks['truck'] == 'CAEX61']
-    CAEX_61 = CAEX_61[['date', 'daily_cycles']]
-
-    other_trucks = all_trucks[all_trucks['truck'] != 'CAEX61']
-    other_trucks = other_trucks[['date', 'daily_cycles']].groupby('date', observed=False)
-    other_trucks = other_trucks.agg(
-        mean = ('daily_cycles', 'mean'),
-        median = ('daily_cycles', 'median'),
-        Q1 = ('daily_cycles', lambda x: x.quantile(0.25)),
-        Q3 = ('daily_cycles', lambda x: x.quantile(0.75)),
-        min = ('daily_cycles', 'min'),
-    ).reset_index()
-
-    return CAEX_61, other_trucks
\ No newline at end of file
+    backend = active_backend()
+    if backend is not None:
+        return backend.truck_comparison('CAEX61')
+
+    comparison = fleet_comparison('cycles', trucks=['CAEX61'],
+                                  statistics=['count', 'mean', 'median', 'Q1', 'Q3', 'min'])
+
+    CAEX_61 = comparison[comparison['value'].notna()]
+    CAEX_61 = pd.DataFrame({'date': CAEX_61['date'], 'daily_cycles': CAEX_61['value'].astype('int64')})
+
+    other_trucks = comparison[comparison['count'] > 0]
+    other_trucks = other_trucks[['date', 'mean', 'median', 'Q1', 'Q3', 'min']]
+
+    return CAEX_61, other_trucks
+
+@instrument('transformation')
+def CAEX61_first_date(variable:Optional[str]=None)->pd.Timestamp:
+    """
+    First day of activity of CAEX61, the newest truck of the fleet, where the recent period
+    analyses start.
+
+    Args:
+    variable: If given, the first day CAEX61 has a non-zero value of this metric
+
+    Returns:
+    pd.Timestamp: The first day
+    """
+    backend = active_backend()
+    if backend is not None:
+        if variable is None:
+            return backend.truck_comparison('CAEX61')[0]['date'].min()
+        daily = backend.rollup(['truck', 'date'], variable, include_zeros=False)
+        return daily[(daily['truck'] == 'CAEX61') & (daily['count'] > 0)]['date'].min()
+
+    cube = load_cube()
+    cells = cube[cube['truck'] == 'CAEX61']
+    if variable is not None:
+        cells = cells[cells[f'{variable}_count'] > 0]
+    return cells['date'].min()
\ No newline at end of file
@@ -1,7 +1,9 @@
 from .aggregate_daily_active_trucks import aggregate_daily_active_trucks
+from .aggregate_daily_and_monthly import aggregate_daily_and_monthly
 from .aggregate_daily_cycles import aggregate_daily_cycles
 from .aggregate_daily_tons import aggregate_daily_tons
 from .aggregate_monthly_cycles import aggregate_monthly_cycles
 from .aggregate_monthly_tons import aggregate_monthly_tons
 from .aggregate_trucks_daily_activity import aggregate_trucks_daily_tons
-from .CAEX61_comparison import CAEX61_comparison
\ No newline at end of file
+from .CAEX61_comparison import CAEX61_comparison, CAEX61_first_date
+from .fleet_comparison import fleet_comparison, screen_fleet
\ No newline at end of file
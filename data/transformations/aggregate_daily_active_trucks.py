@@ -1,22 +1,30 @@
 import pandas as pd
+from ..backends import active_backend
+from ..query import scan
+from ..metrics import instrument
 
-def aggregate_daily_active_trucks()->pd.DataFrame:
+@instrument('transformation')
+def aggregate_daily_active_trucks(cube:pd.DataFrame=None)->pd.DataFrame:
     """
     Aggregates the total number of active trucks per day
 
+    Args:
+    cube: Cube of the haul cycles to aggregate, as returned by build_cube. If None, the
+    whole dataset
+
     Returns:
     pd.DataFrame: A DataFrame containing:
     - date, datetime: day
     - daily_active_trucks, int: The total number of active trucks for that day
     """
+    backend = active_backend()
+    if cube is None and backend is not None:
+        return backend.daily_active_trucks()
 
-    df_path = 'files/timeseries_haul_loading_data.csv'
-    df = pd.read_csv(df_path)
-
-    df = df[['date', 'truck']]
-    df = df.drop_duplicates()
+    truck_days = scan(df=cube).group_by('date', 'truck').agg(cycles=('date', 'size')).collect()
 
-    daily_truck_cycles = df.groupby('date').size().reset_index(name='daily_active_trucks')
-    daily_truck_cycles['date'] = pd.to_datetime(daily_truck_cycles['date'])
+    daily_truck_cycles = scan(df=truck_days).group_by('date').agg(
+        daily_active_trucks=('truck', 'size')
+    ).collect()
 
     return daily_truck_cycles
\ No newline at end of file
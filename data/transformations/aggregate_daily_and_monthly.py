@@ -0,0 +1,39 @@
+from typing import Tuple
+import pandas as pd
+from ..backends import active_backend
+from ..query import scan
+from ..metrics import instrument
+from .aggregate_monthly_cycles import aggregate_monthly_cycles
+from .aggregate_monthly_tons import aggregate_monthly_tons
+
+@instrument('transformation')
+def aggregate_daily_and_monthly(cube:pd.DataFrame=None)->Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Aggregates the cycles and tons per day and per month together, the days are computed
+    in a single pass and the monthly statistics from them.
+
+    Args:
+    cube: Cube of the haul cycles to aggregate, as returned by build_cube. If None, the
+    whole dataset
+
+    Returns:
+    Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    - daily: date, daily_cycles and daily_tons as in aggregate_daily_cycles and
+    aggregate_daily_tons, plus month, str
+    - monthly_cycles: as returned by aggregate_monthly_cycles
+    - monthly_tons: as returned by aggregate_monthly_tons
+    """
+    backend = active_backend()
+    if cube is None and backend is not None:
+        daily = backend.daily_totals()
+    else:
+        daily = scan(df=cube).group_by('date').agg(
+            daily_cycles=('date', 'size'),
+            daily_tons=('ton', 'sum'),
+        ).collect()
+
+    monthly_cycles = aggregate_monthly_cycles(daily[['date', 'daily_cycles']])
+    monthly_tons = aggregate_monthly_tons(daily[['date', 'daily_tons']])
+    daily['month'] = daily['date'].dt.to_period('M').astype(str)
+
+    return daily, monthly_cycles, monthly_tons
@@ -1,18 +1,25 @@
 import pandas as pd
-def aggregate_daily_cycles()->pd.DataFrame:
+from ..backends import active_backend
+from ..query import scan
+from ..metrics import instrument
+@instrument('transformation')
+def aggregate_daily_cycles(cube:pd.DataFrame=None)->pd.DataFrame:
     """
     Aggregates the total number of cycles per day
 
+    Args:
+    cube: Cube of the haul cycles to aggregate, as returned by build_cube. If None, the
+    whole dataset
+
     Returns:
     pd.DataFrame: A DataFrame containing:
     - date, datetime: day
     - daily_cycles, int: The total number of cycles for that day
     """
-    df_path = 'files/timeseries_haul_loading_data.csv'
-
-    df = pd.read_csv(df_path)
+    backend = active_backend()
+    if cube is None and backend is not None:
+        return backend.daily_totals()[['date', 'daily_cycles']]
 
-    daily_cycles = df.groupby('date').size().reset_index(name='daily_cycles')
-    daily_cycles['date'] = pd.to_datetime(daily_cycles['date'])
+    daily_cycles = scan(df=cube).group_by('date').agg(daily_cycles=('date', 'size')).collect()
 
     return daily_cycles
\ No newline at end of file
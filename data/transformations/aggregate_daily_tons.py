@@ -1,18 +1,25 @@
 import pandas as pd
-def aggregate_daily_tons()->pd.DataFrame:
+from ..backends import active_backend
+from ..query import scan
+from ..metrics import instrument
+@instrument('transformation')
+def aggregate_daily_tons(cube:pd.DataFrame=None)->pd.DataFrame:
     """
     Aggregates the total tons for each day in the dataset.
 
+    Args:
+    cube: Cube of the haul cycles to aggregate, as returned by build_cube. If None, the
+    whole dataset
+
     Returns:
     pd.DataFrame: A DataFrame containing:
     - date, datetime: day
     - daily_tons, float: total tons for that day
     """
-    df_path = 'files/timeseries_haul_loading_data.csv'
-
-    df = pd.read_csv(df_path)
+    backend = active_backend()
+    if cube is None and backend is not None:
+        return backend.daily_totals()[['date', 'daily_tons']]
 
-    daily_tons = df.groupby('date')['ton'].sum().reset_index(name='daily_tons')
-    daily_tons['date'] = pd.to_datetime(daily_tons['date'])
+    daily_tons = scan(df=cube).group_by('date').agg(daily_tons=('ton', 'sum')).collect()
 
     return daily_tons
\ No newline at end of file
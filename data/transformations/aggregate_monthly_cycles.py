@@ -1,10 +1,17 @@
 import pandas as pd
-import numpy as np
+from ..backends import active_backend
+from ..query import scan
+from ..metrics import instrument
 from .aggregate_daily_cycles import aggregate_daily_cycles
-def aggregate_monthly_cycles()->pd.DataFrame:
+@instrument('transformation')
+def aggregate_monthly_cycles(daily_cycles:pd.DataFrame=None)->pd.DataFrame:
     """
     Aggregates the total number of cycles per month 
 
+    Args:
+    daily_cycles: Daily cycles to aggregate, as returned by aggregate_daily_cycles. If None,
+    the whole dataset
+
     Returns:
     pd.DataFrame: A DataFrame with:
     - 'month', str : The month 
@@ -18,27 +25,16 @@ def aggregate_monthly_cycles()->pd.DataFrame:
     - 'Q3', float : The third quartile of the daily cycles in that month
     """
 
-    daily_cycles = aggregate_daily_cycles()
-
-    daily_cycles['date'] = pd.to_datetime(daily_cycles['date'])
-    daily_cycles['month'] = daily_cycles['date'].dt.to_period('M')
-
-    q1 = lambda x: np.percentile(x, 25)
-    q3 = lambda x: np.percentile(x, 75)
-
-    monthly_cycles = daily_cycles.groupby('month').agg(
-        sum=('daily_cycles', 'sum'),
-        mean=('daily_cycles', 'mean'),
-        median=('daily_cycles', 'median'),
-        std=('daily_cycles', 'std'),
-        min=('daily_cycles', 'min'),
-        max=('daily_cycles', 'max'),
-        Q1=('daily_cycles', q1),
-        Q3=('daily_cycles', q3)
-    )
+    backend = active_backend()
+    if daily_cycles is None and backend is not None:
+        return backend.monthly_statistics(aggregate_daily_cycles(), 'daily_cycles')
+    if daily_cycles is None:
+        daily_cycles = aggregate_daily_cycles()
 
-    monthly_cycles = monthly_cycles.reset_index()
-    monthly_cycles['month'] = monthly_cycles['month'].astype(str)
+    statistics = ['sum', 'mean', 'median', 'std', 'min', 'max', 'Q1', 'Q3']
+    monthly_cycles = scan(df=daily_cycles).group_by('month').agg(
+        **{statistic: ('daily_cycles', statistic) for statistic in statistics}
+    ).collect()
 
     return monthly_cycles
 
@@ -1,11 +1,18 @@
 import pandas as pd
-import numpy as np
+from ..backends import active_backend
+from ..query import scan
+from ..metrics import instrument
 from .aggregate_daily_tons import aggregate_daily_tons
 
-def aggregate_monthly_tons()->pd.DataFrame:
+@instrument('transformation')
+def aggregate_monthly_tons(daily_tons:pd.DataFrame=None)->pd.DataFrame:
     """
     Aggregates the total number of tons per month 
 
+    Args:
+    daily_tons: Daily tons to aggregate, as returned by aggregate_daily_tons. If None,
+    the whole dataset
+
     Returns:
     pd.DataFrame: A DataFrame with:
     - 'month', str : The month 
@@ -19,29 +26,16 @@ def aggregate_monthly_tons()->pd.DataFrame:
     - 'Q3', float : The third quartile of the daily tons in that month
     """
 
-    daily_tons = aggregate_daily_tons()
-
-    daily_tons['date'] = pd.to_datetime(daily_tons['date'])
-    daily_tons['month'] = daily_tons['date'].dt.to_period('M')
-
-    q1 = lambda x: np.percentile(x, 25)
-    q3 = lambda x: np.percentile(x, 75)
-
-    
-
-    monthly_tons = daily_tons.groupby('month').agg(
-        sum=('daily_tons', 'sum'),
-        mean=('daily_tons', 'mean'),
-        median=('daily_tons', 'median'),
-        std=('daily_tons', 'std'),
-        min=('daily_tons', 'min'),
-        max=('daily_tons', 'max'),
-        Q1=('daily_tons', q1),
-        Q3=('daily_tons', q3)
-    )
+    backend = active_backend()
+    if daily_tons is None and backend is not None:
+        return backend.monthly_statistics(aggregate_daily_tons(), 'daily_tons')
+    if daily_tons is None:
+        daily_tons = aggregate_daily_tons()
 
-    monthly_tons = monthly_tons.reset_index()
-    monthly_tons['month'] = monthly_tons['month'].astype(str)
+    statistics = ['sum', 'mean', 'median', 'std', 'min', 'max', 'Q1', 'Q3']
+    monthly_tons = scan(df=daily_tons).group_by('month').agg(
+        **{statistic: ('daily_tons', statistic) for statistic in statistics}
+    ).collect()
 
     return monthly_tons
 
@@ -1,20 +1,53 @@
 import pandas as pd
+from ..query import scan
+from ..metrics import instrument
 
-def aggregate_trucks_daily_tons(only_active_trucks:bool)->pd.DataFrame:
+@instrument('transformation')
+def aggregate_trucks_daily_tons(only_active_trucks:bool, cube:pd.DataFrame=None)->pd.DataFrame:
+    """
+    Aggregates the cycles and tons of each truck per day
 
-    df_path = 'files/timeseries_haul_loading_data.csv'
-    df = pd.read_csv(df_path)
+    Args:
+    only_active_trucks: If True, only the days a truck had cycles are included. Else, every
+    truck of the fleet gets a row for every day, with 0 cycles when it wasn't active.
+    cube: Cube of the haul cycles to aggregate, as returned by build_cube. If None, the
+    whole dataset
 
-    daily_truck_activity = df.groupby(['truck','date'], observed=only_active_trucks).agg(
+    Returns:
+    pd.DataFrame: A DataFrame containing:
+    - truck, category: truck code
+    - date, datetime: day
+    - total_daily_cycles, int: number of cycles of the truck that day
+    - total_daily_tons, float: tons moved by the truck that day
+    - mean_daily_tons, median_daily_tons, Q1_daily_tons, Q3_daily_tons, float: statistics
+    of the tons per cycle of the truck that day
+    """
+    daily_truck_activity = scan(df=cube).group_by('truck', 'date').agg(
         total_daily_cycles=('ton', 'count'),
         total_daily_tons=('ton', 'sum'),
         mean_daily_tons=('ton', 'mean'),
         median_daily_tons=('ton', 'median'),
-        Q1_daily_tons=('ton', lambda x: x.quantile(0.25)),
-        Q3_daily_tons=('ton', lambda x: x.quantile(0.75))
-    )
+        Q1_daily_tons=('ton', 'Q1'),
+        Q3_daily_tons=('ton', 'Q3'),
+    ).collect()
 
-    daily_truck_activity = daily_truck_activity.reset_index()
-    daily_truck_activity['date'] = pd.to_datetime(daily_truck_activity['date'])
+    if not only_active_trucks:
+        daily_truck_activity = _with_inactive_truck_days(daily_truck_activity)
 
-    return daily_truck_activity
\ No newline at end of file
+    return daily_truck_activity
+
+def _with_inactive_truck_days(daily_truck_activity:pd.DataFrame)->pd.DataFrame:
+    """
+    Adds a row with 0 cycles for every (truck, day) without activity, as the categorical
+    groupby with observed=False does.
+    """
+    trucks = daily_truck_activity['truck'].cat.categories
+    dates = daily_truck_activity['date'].drop_duplicates().sort_values()
+    trucks = pd.CategoricalIndex(trucks, categories=trucks)
+    index = pd.MultiIndex.from_product([trucks, dates], names=['truck', 'date'])
+
+    daily_truck_activity = daily_truck_activity.set_index(['truck', 'date']).reindex(index)
+    daily_truck_activity['total_daily_cycles'] = daily_truck_activity['total_daily_cycles'].fillna(0).astype('int64')
+    daily_truck_activity['total_daily_tons'] = daily_truck_activity['total_daily_tons'].fillna(0)
+
+    return daily_truck_activity.reset_index()
\ No newline at end of file
@@ -0,0 +1,128 @@
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from ..fleet_matrix import fleet_matrix
+from ..statistics import QUANTILES, STATISTICS
+from ..metrics import instrument
+
+@instrument('transformation')
+def fleet_comparison(metric:str='cycles', trucks:Optional[List[str]]=None, agg_func:str='sum',
+                     statistics:Optional[List[str]]=None, include_zeros:bool=True,
+                     cube:pd.DataFrame=None)->pd.DataFrame:
+    """
+    Compares the daily value of each truck with the rest of the fleet on the same day.
+
+    The rows of the fleet matrix (see data.fleet_matrix), one per day, are sorted once. The
+    statistics of the fleet without a truck are read from its day's sorted row skipping the
+    truck's rank, so every truck is compared in the same vectorized pass.
+
+    Args:
+    metric: cycles, or any metric of the cube (ton, distance_empty, truck_total_cycle, ...)
+    trucks: Trucks to compare, all of them if None
+    agg_func: sum or mean, how the values of a metric are aggregated per truck and day.
+    Ignored for cycles, which are counted
+    statistics: Statistics of the rest of the fleet, any of data.statistics.STATISTICS in the
+    requested order. All if None
+    include_zeros: If False, cycles where the metric is 0 are discarded
+    cube: Cube of the haul cycles, as returned by build_cube. If None, the whole dataset
+
+    Returns:
+    pd.DataFrame: A DataFrame with a row per truck and day of the dataset containing:
+    - truck, category: truck code
+    - date, datetime: day
+    - value, float: value of the truck that day, NaN if it wasn't active
+    - count, int: number of other trucks active that day
+    - sum, mean, std, min, Q1, median, Q3, max, float: statistics of the values of the
+    other active trucks that day, NaN if there were none
+    """
+    if statistics is None:
+        statistics = STATISTICS
+
+    values, dates, fleet = fleet_matrix(metric, agg_func, include_zeros, cube)
+    columns = np.arange(len(fleet)) if trucks is None else fleet.get_indexer(trucks)
+    if (columns < 0).any():
+        raise KeyError(f'Unknown trucks: {[truck for truck in trucks if truck not in fleet]}')
+
+    active = ~np.isnan(values)
+    order = np.argsort(values, axis=1, kind='stable')
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(len(fleet))[np.newaxis, :], axis=1)
+
+    # One entry per (day, compared truck), the truck's value is left out of its day's row
+    day_active = active.sum(axis=1)[:, np.newaxis]
+    own = values[:, columns]
+    own_active = active[:, columns]
+    others = day_active - own_active
+    rank = np.where(own_active, ranks[:, columns], day_active)
+    own_value = np.where(own_active, own, 0)
+
+    computed = {'count': others}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = np.nansum(values, axis=1)[:, np.newaxis] - own_value
+        squares = np.nansum(values ** 2, axis=1)[:, np.newaxis] - own_value ** 2
+        computed['sum'] = np.where(others > 0, total, np.nan)
+        computed['mean'] = total / others
+        variance = (squares - total ** 2 / others) / (others - 1)
+        computed['std'] = np.sqrt(np.clip(variance, 0, None))
+
+    rows = np.arange(len(dates))[:, np.newaxis]
+    last = np.maximum(others - 1, 0)
+    for statistic in statistics:
+        if statistic not in QUANTILES:
+            continue
+        position = last * QUANTILES[statistic]
+        below = np.floor(position).astype('int64')
+        above = np.minimum(below + 1, last)
+        fraction = position - below
+        # Position k among the others is position k of the row, or k + 1 past the truck
+        low = sorted_values[rows, np.minimum(below + (below >= rank), len(fleet) - 1)]
+        high = sorted_values[rows, np.minimum(above + (above >= rank), len(fleet) - 1)]
+        computed[statistic] = np.where(others > 0, low + (high - low) * fraction, np.nan)
+
+    comparison = pd.DataFrame({
+        'truck': pd.Categorical.from_codes(np.repeat(columns, len(dates)), categories=fleet),
+        'date': np.tile(dates, len(columns)),
+        'value': own.T.ravel(),
+        **{statistic: computed[statistic].T.ravel() for statistic in statistics},
+    })
+    return comparison
+
+@instrument('transformation')
+def screen_fleet(metric:str='cycles', agg_func:str='sum', include_zeros:bool=True,
+                 cube:pd.DataFrame=None)->pd.DataFrame:
+    """
+    Ranks the trucks by how often they fall in the first quartile of the rest of the fleet,
+    the criterion of the CAEX61 analysis, to find under-performers.
+
+    Args:
+    metric: cycles, or any metric of the cube
+    agg_func: sum or mean, how the values of a metric are aggregated per truck and day
+    include_zeros: If False, cycles where the metric is 0 are discarded
+    cube: Cube of the haul cycles, as returned by build_cube. If None, the whole dataset
+
+    Returns:
+    pd.DataFrame: A DataFrame sorted by share_below_Q1, highest first, containing:
+    - truck, category: truck code
+    - active_days, int: days the truck had a value
+    - days_below_Q1, int: active days below the first quartile of the other trucks
+    - share_below_Q1, float: days_below_Q1 / active_days
+    - median_ratio, float: median over the active days of the truck's value divided by the
+    median of the other trucks
+    """
+    comparison = fleet_comparison(metric, agg_func=agg_func, statistics=['Q1', 'median'],
+                                  include_zeros=include_zeros, cube=cube)
+    comparison = comparison[comparison['value'].notna()]
+    comparison = comparison.assign(
+        below_Q1=comparison['value'] < comparison['Q1'],
+        ratio=comparison['value'] / comparison['median'],
+    )
+
+    screening = comparison.groupby('truck', observed=True).agg(
+        active_days=('value', 'size'),
+        days_below_Q1=('below_Q1', 'sum'),
+        median_ratio=('ratio', 'median'),
+    )
+    screening['share_below_Q1'] = screening['days_below_Q1'] / screening['active_days']
+    screening = screening[['active_days', 'days_below_Q1', 'share_below_Q1', 'median_ratio']]
+    return screening.sort_values('share_below_Q1', ascending=False).reset_index()
@@ -1,3 +1,4 @@
+import logging
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
@@ -18,6 +19,8 @@ from dashboard.truck_cycle_section import layout as truck_cycle_analysis_layout
 from dashboard.loader_cycle_section import layout as loader_cycle_analysis_layout
 from dashboard.empty_distance_section import layout as empty_distance_analysis_layout
 from dashboard.loaded_distance_section import layout as loaded_distance_analysis_layout
+from dashboard.metrics import register_metrics
+from dashboard.profiling import register_profiling
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.JOURNAL])
 theme_switch = ThemeSwitchAIO(
@@ -107,5 +110,8 @@ def display_page(pathname):
         ])
 
 register_monthly_callbacks(app)
+register_metrics(app)
+register_profiling(app)
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     app.run_server(debug=False)